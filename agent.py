@@ -1,9 +1,10 @@
-from typing import TypedDict, Annotated, List, Literal
+from typing import TypedDict, Annotated, List, Dict, Literal
 import operator
 import os
 import json
 import uuid
 import asyncio
+import time
 from dotenv import load_dotenv
 
 from langgraph.graph import StateGraph, START, END
@@ -12,11 +13,25 @@ from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 
 from langfuse.langchain import CallbackHandler
 from langfuse import observe
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+import groq
 
 from services.web_search_agent_demo import web_agent, web_search_agent_model
 from services.git_search import github_agent
-from services.db_query_demo import postgres_agent, get_pg_connection
-from services.orc_demo import orchestrator_model, orchestrator_prompts
+from services.db_query_demo import postgres_agent
+from services.db_pool import pg_connection, close_pool, pool_metrics
+from services.title_cache import title_cache, notify_payload, DOCUMENTS_CHANNEL
+from services.document_chunks import insert_chunks
+from services.document_index import document_index, load_document_index, DOC_INDEX_ENABLED
+from services.title_index import DB_TITLES_TOP_K
+from services.orc_demo import orchestrator_router, orchestrator_prompts, confident_workers, WorkerRoute
+from services.fast_router import fast_router
+from services.blocking import configure_event_loop, run_blocking
+from services.map_reduce_summary import reduce_research
+from services.research_cache import research_cache
+from services.tool_cache import tool_cache
+from services.mco.client_pool import mcp_pool
 from services.make_pretty_output import pretty
 
 load_dotenv()
@@ -26,8 +41,11 @@ langfuse_handler = CallbackHandler()
 class AgentState(TypedDict):
     content_to_research: str
     research_content: Annotated[List[str], operator.add]
-    node_to_call: List[Literal["web", "github", "db"]]
+    node_to_call: List[Literal["web", "git", "db"]]
+    route_confidence: Dict[str, float]
+    sub_queries: Dict[str, List[str]]
     final_research_summary: str
+    from_cache: bool
     approval: bool
     db_titles: List[str]
 
@@ -43,48 +61,101 @@ def ask_topic_node(state: AgentState):
         "content_to_research": topic,
         "research_content": [],
         "node_to_call": [],
+        "route_confidence": {},
+        "sub_queries": {},
         "final_research_summary": "",
         "approval": None,
+        "from_cache": False,
         "db_titles": [],
     }
 
 
+@observe(name="research_cache_node")
+def research_cache_node(state: AgentState):
+    hit = research_cache.lookup(state["content_to_research"])
+    if hit is None:
+        return {"from_cache": False}
+
+    print(
+        f"\n Reusing research on '{hit['topic']}' (similarity {hit['similarity']:.2f}) \n"
+        f"\n\n Final Summary \n \n {hit['summary']} \n \n"
+    )
+    return {"final_research_summary": hit["summary"], "from_cache": True}
+
+
 @observe(name="fetch_db_titles")
-def fetch_db_titles(state: AgentState):
-    conn = get_pg_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT title FROM documents")
-    titles = [r[0] for r in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return {"db_titles": titles}
+async def fetch_db_titles(state: AgentState):
+    # only the titles relevant to this topic reach the state and the orchestrator prompt
+    index = await title_cache.get_index()
+    return {"db_titles": index.top_k(state["content_to_research"], DB_TITLES_TOP_K)}
 
 
 @observe(name="orchestrator_node")
 async def orchestrator_node(state: AgentState):
-    response = orchestrator_model.invoke(
-        orchestrator_prompts.format_messages(
-            user_content=state['content_to_research'],
-            db_content=state['db_titles']
+    l = fast_router.route(state['content_to_research'], state['db_titles'])
+
+    if l is not None:
+        print(f"Orchestrator (fast path) have decided to do following \n {l} \n")
+        return {
+            "node_to_call": l,
+            "route_confidence": {node: 1.0 for node in l},
+            "sub_queries": {},
+        }
+
+    start = time.perf_counter()
+    try:
+        decision = await orchestrator_router.ainvoke(
+            orchestrator_prompts.format_messages(
+                user_content=state['content_to_research'],
+                db_content=state['db_titles']
+            )
         )
+        routes = decision.routes if decision else []
+    except (OutputParserException, ValidationError, groq.BadRequestError) as e:
+        # groq reports a malformed structured-output call as a 400 "tool_use_failed"
+        workers = ["web", "git"] + (["db"] if state['db_titles'] else [])
+        print(f"Orchestrator reply could not be parsed ({e}), falling back to {workers}")
+        return {
+            "node_to_call": workers,
+            "route_confidence": {node: 1.0 for node in workers},
+            "sub_queries": {},
+        }
+
+    if not routes:
+        routes = [WorkerRoute(worker="web", confidence=1.0)]
+
+    confidence = {}
+    sub_queries = {}
+    for route in routes:
+        confidence[route.worker] = max(confidence.get(route.worker, 0.0), route.confidence)
+        sub_queries.setdefault(route.worker, []).extend(route.sub_queries)
+
+    l = list(confidence)
+    fast_router.remember(
+        state['content_to_research'], state['db_titles'], confident_workers(confidence),
+        llm_ms=(time.perf_counter() - start) * 1000
     )
 
-    ans = response.content
-    l = []
+    print(f"Orchestrator have decided to do following \n {confidence} \n")
 
-    for a in ans.split(','):
-        l.append(a.split("'")[1])
-    
-    print(f"Orchestrator have decided to do following \n {l} \n")
-    
-    state['node_to_call'] = l
-    return state
+    return {
+        "node_to_call": l,
+        "route_confidence": confidence,
+        "sub_queries": sub_queries,
+    }
 
 
 @observe(name="assign_workers")
 def assign_workers(state: AgentState):
+    confidence = {node: state["route_confidence"].get(node, 1.0) for node in state["node_to_call"]}
+    workers = confident_workers(confidence)
+
+    skipped = [node for node in state["node_to_call"] if node not in workers]
+    if skipped:
+        print(f"Skipping low confidence workers: {skipped} \n")
+
     sends = []
-    for node in state["node_to_call"]:
+    for node in workers:
         if node == "web":
             sends.append(Send("web_search", state))
         elif node == "git":
@@ -94,6 +165,13 @@ def assign_workers(state: AgentState):
     return sends
 
 
+def sub_query_hint(state: AgentState, worker: str) -> str:
+    queries = state.get("sub_queries", {}).get(worker, [])
+    if not queries:
+        return ""
+    return "Suggested queries:\n" + "\n".join(f"- {q}" for q in queries) + "\n\n"
+
+
 
 @observe(name="web_search_node")
 async def web_search_node(state: AgentState):
@@ -108,6 +186,7 @@ async def web_search_node(state: AgentState):
                     "content": (
                         "Research the following topic thoroughly:\n\n"
                         f"{state['content_to_research']}\n\n"
+                        f"{sub_query_hint(state, 'web')}"
                         "Instructions:\n"
                         "- Prefer authoritative and recent sources\n"
                         "- Merge overlapping information\n"
@@ -135,6 +214,7 @@ async def github_search_node(state: AgentState):
                     "role": "user",
                     "content": (
                         f"for this {state['content_to_research']}\n\n"
+                        f"{sub_query_hint(state, 'git')}"
                         "First find top GitHub repositories. "
                         "Then find demo code or notebooks. "
                         "Finally generate a simple example."
@@ -163,6 +243,7 @@ async def db_search_node(state: AgentState):
                     "content": (
                         f"Research the following topic thoroughly:\n\n"
                         f"{state['content_to_research']}\n\n"
+                        f"{sub_query_hint(state, 'db')}"
                         "Instructions:\n"
                         "- Use database information only\n"
                         "- Merge overlapping results\n"
@@ -186,13 +267,28 @@ def join_results_node(state: AgentState):
 @observe(name="final_summary_node")
 async def final_summary_node(state: AgentState):
     print("\n Deep thinking on content... \n")
-    combined = "\n\n".join(state["research_content"])
-    response = await web_search_agent_model.ainvoke(
+    # oversized worker output is condensed first so the report prompt fits the model context
+    combined = await reduce_research(state["research_content"], web_search_agent_model)
+    print("\n\n Final Summary \n")
+
+    # streamed so stream_mode="messages" consumers (CLI, SSE) get tokens as they arrive
+    parts = []
+    async for chunk in web_search_agent_model.astream(
         f"Summarize into a final research report, if code demo present then write it as it is:\n{combined}"
-    )
+    ):
+        parts.append(chunk.content)
+
+    summary = "".join(parts)
+    return {"final_research_summary": summary}
 
-    print(f"\n\n Final Summary \n \n {response.content} \n \n")
-    return {"final_research_summary": response.content}
+
+def summary_token(message, metadata) -> str:
+    """
+    Text of a stream_mode="messages" chunk if it belongs to the final report.
+    """
+    if metadata.get("langgraph_node") != "final_summary":
+        return ""
+    return message.content if isinstance(message.content, str) else ""
 
 
 @observe(name="approval_node")
@@ -206,22 +302,38 @@ def approval_node(state: AgentState):
 
 
 @observe(name="save_db_node")
-def save_db_node(state: AgentState):
-    conn = get_pg_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO documents (title, content) VALUES (%s, %s)",
-        (state["content_to_research"], state["final_research_summary"])
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+async def save_db_node(state: AgentState):
+    # a cached answer is already in documents and the cache; storing it again
+    # would reset its age, so reused summaries would never expire
+    if state.get("from_cache"):
+        return initial_state()
+    research_cache.store(state["content_to_research"], state["final_research_summary"])
+
+    async with pg_connection() as conn:
+        cur = await conn.execute(
+            "INSERT INTO documents (title, content) VALUES (%s, %s) RETURNING id",
+            (state["content_to_research"], state["final_research_summary"])
+        )
+        document_id = (await cur.fetchone())[0]
+        # passages for search_postgres, committed together with the document
+        await insert_chunks(conn, document_id, state["content_to_research"], state["final_research_summary"])
+        # delivered to every title cache listener when the insert commits
+        await conn.execute(
+            "SELECT pg_notify(%s, %s)",
+            (DOCUMENTS_CHANNEL, notify_payload(state["content_to_research"]))
+        )
+    title_cache.add(state["content_to_research"])
+    if DOC_INDEX_ENABLED:
+        await run_blocking(document_index.add, document_id, state["content_to_research"], state["final_research_summary"])
     return {
                 "content_to_research": "",
                 "research_content": [],
                 "node_to_call": [],
+                "route_confidence": {},
+                "sub_queries": {},
                 "final_research_summary": "",
                 "approval": None,
+                "from_cache": False,
                 "db_titles": [],
             }
 
@@ -230,6 +342,7 @@ def save_db_node(state: AgentState):
 graph = StateGraph(AgentState)
 
 graph.add_node("ask_topic", ask_topic_node)
+graph.add_node("research_cache", research_cache_node)
 graph.add_node("fetch_db_titles", fetch_db_titles)
 graph.add_node("orchestrator", orchestrator_node)
 
@@ -243,7 +356,12 @@ graph.add_node("approval", approval_node)
 graph.add_node("save_db", save_db_node)
 
 graph.add_edge(START, "ask_topic")
-graph.add_edge("ask_topic", "fetch_db_titles")
+graph.add_edge("ask_topic", "research_cache")
+graph.add_conditional_edges(
+    "research_cache",
+    lambda state: state["from_cache"],
+    {True: "approval", False: "fetch_db_titles"}
+)
 graph.add_edge("fetch_db_titles", "orchestrator")
 
 graph.add_conditional_edges(
@@ -271,56 +389,84 @@ graph.add_edge("save_db", "ask_topic")
 
 CHECKPOINTER_DB_URL = os.getenv("CHECKPOINTER_DB_URL")
 
+
+def initial_state() -> AgentState:
+    return {
+        "content_to_research": "",
+        "research_content": [],
+        "node_to_call": [],
+        "route_confidence": {},
+        "sub_queries": {},
+        "final_research_summary": "",
+        "approval": None,
+        "from_cache": False,
+        "db_titles": [],
+    }
+
+
+async def run_until_interrupt(workflow, graph_input, config):
+    async for message, metadata in workflow.astream(graph_input, config, stream_mode="messages"):
+        token = summary_token(message, metadata)
+        if token:
+            print(token, end="", flush=True)
+    print()
+
+
 async def main():
+    configure_event_loop()
+    await load_document_index()
+
     async with AsyncPostgresSaver.from_conn_string(CHECKPOINTER_DB_URL) as memory:
         # await memory.setup()
 
-        while True:
-            workflow = graph.compile(checkpointer=memory)
+        workflow = graph.compile(checkpointer=memory)
 
-            config = {
-                "configurable": {
-                    "thread_id": f"research-{uuid.uuid4()}"
-                },
-                "callbacks": [langfuse_handler]
-            }
+        try:
+            while True:
+                config = {
+                    "configurable": {
+                        "thread_id": f"research-{uuid.uuid4()}"
+                    },
+                    "callbacks": [langfuse_handler]
+                }
 
-            await workflow.ainvoke(
-                {
-                    "content_to_research": "",
-                    "research_content": [],
-                    "node_to_call": [],
-                    "final_research_summary": "",
-                    "approval": None,
-                    "db_titles": [],
-                },
-                config
-            )
+                await run_until_interrupt(workflow, initial_state(), config)
 
-            while True:
-                snapshot = await workflow.aget_state(config)
+                while True:
+                    snapshot = await workflow.aget_state(config)
 
-                if not snapshot.interrupts:
-                    break
+                    if not snapshot.interrupts:
+                        break
 
-                interrupt_data = snapshot.interrupts[0].value
-                print("\n" + interrupt_data["question"])
+                    interrupt_data = snapshot.interrupts[0].value
+                    print("\n" + interrupt_data["question"])
 
-                if "options" in interrupt_data:
-                    print("Options:", interrupt_data["options"])
+                    if "options" in interrupt_data:
+                        print("Options:", interrupt_data["options"])
 
-                user_input = input("> ").strip()
+                    user_input = input("> ").strip()
 
-                if user_input.lower() == "exit":
-                    print("\n Exiting research assistant")
-                    return
+                    if user_input.lower() == "exit":
+                        print("\n Exiting research assistant")
+                        return
 
-                await workflow.ainvoke(
-                    Command(resume=user_input),
-                    config
-                )
+                    await run_until_interrupt(
+                        workflow,
+                        Command(resume=user_input),
+                        config
+                    )
 
-            print("\n Research cycle completed\n")
+                print("\n Research cycle completed\n")
+        finally:
+            print(f"\n DB pool metrics: {pool_metrics()} \n")
+            print(f" Router metrics: {fast_router.metrics()} \n")
+            print(f" Research cache metrics: {research_cache.metrics()} \n")
+            print(f" Tool cache metrics: {tool_cache.metrics()} \n")
+            print(f" MCP pool metrics: {mcp_pool.metrics()} \n")
+            print(f" Document index metrics: {document_index.metrics()} \n")
+            await title_cache.close()
+            await mcp_pool.close()
+            await close_pool()
 
 if __name__ == "__main__":
     asyncio.run(main())
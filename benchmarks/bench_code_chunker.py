@@ -0,0 +1,92 @@
+# Chunk count, total tokens sent to the summarizer and definitions cut in
+# half by the fixed-size window chunker (chunk_spans, 1200 chars / 200
+# overlap) against the syntax-aware one (services.code_chunker).
+# ~tokens is the repo's usual estimate (1 token ~ 4 characters).
+#
+# run from the repo root:  python -m benchmarks.bench_code_chunker [path/to/python/tree]
+# (defaults to the standard library; uses the same .env as the g.py pipeline)
+
+import os
+import ast
+import sys
+import time
+
+from services.g import chunk_spans
+from services.code_chunker import chunk_code_spans, estimate_tokens, CODE_CHUNK_TOKENS
+
+
+def load_sources(root: str, limit=2000):
+    sources = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in ("site-packages", "__pycache__", ".git"))
+        for name in sorted(filenames):
+            if name.endswith(".py"):
+                path = os.path.join(dirpath, name)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        sources[path] = f.read()
+                except (UnicodeDecodeError, OSError):
+                    continue
+                if len(sources) >= limit:
+                    return sources
+    return sources
+
+
+def definition_spans(text: str):
+    """
+    Character ranges of top-level functions and classes.
+    """
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    starts = [0]
+    for line in text.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return [
+        (starts[node.lineno - 1], starts[node.end_lineno])
+        for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+
+
+def split_definitions(spans, definitions, budget_chars: int) -> int:
+    """
+    Definitions that fit in one chunk but no chunk holds whole.
+    """
+    split = 0
+    for start, end in definitions:
+        if end - start > budget_chars:
+            continue
+        if not any(offset <= start and end <= offset + len(chunk) for offset, chunk in spans):
+            split += 1
+    return split
+
+
+def measure(name: str, chunker, sources, budget_chars: int):
+    start = time.perf_counter()
+    per_file = {path: chunker(path, text) for path, text in sources.items()}
+    elapsed = (time.perf_counter() - start) * 1000
+
+    chunks = sum(len(spans) for spans in per_file.values())
+    tokens = sum(estimate_tokens(chunk) for spans in per_file.values() for _, chunk in spans)
+    split = sum(
+        split_definitions(per_file[path], definition_spans(text), budget_chars)
+        for path, text in sources.items()
+    )
+    print(f"{name:>14} | {chunks:>8} | {tokens:>10} | {tokens / max(chunks, 1):>11.0f} | {split:>10} | {elapsed:>8.0f}")
+    return tokens
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.__file__)
+    sources = load_sources(root)
+    source_tokens = sum(estimate_tokens(text) for text in sources.values())
+    print(f"{len(sources)} files under {root}, ~{source_tokens} source tokens, "
+          f"code chunk budget {CODE_CHUNK_TOKENS} tokens\n")
+
+    print(f"{'chunker':>14} | {'chunks':>8} | {'~tokens':>10} | {'tokens/chunk':>11} | {'split defs':>10} | {'ms':>8}")
+    fixed = measure("fixed 1200/200", lambda path, text: chunk_spans(text), sources, 1200)
+    syntax = measure("syntax-aware", lambda path, text: chunk_code_spans(text, path), sources, CODE_CHUNK_TOKENS * 4)
+
+    print(f"\n~tokens saved: {fixed - syntax} ({(fixed - syntax) / max(fixed, 1):.0%})")
@@ -0,0 +1,93 @@
+# Build time, reopen time and query latency of the in-process document
+# index (services/document_index.py) on a generated corpus, the cost of
+# adding documents afterwards, and latency / how many of the exact top 5
+# are kept with a DOC_INDEX_MAX_POSTINGS cut-off. No database needed.
+#
+# run from the repo root:  python -m benchmarks.bench_document_index
+# BENCH_DOCS sets the corpus size (default 300k), BENCH_MAX_POSTINGS the cut-off.
+
+import os
+import time
+import random
+import tempfile
+import statistics
+
+from services.document_index import DocumentIndex
+
+BENCH_DOCS = int(os.getenv("BENCH_DOCS", "300000"))
+BENCH_MAX_POSTINGS = int(os.getenv("BENCH_MAX_POSTINGS", "4096"))
+WORDS_PER_DOC = 80
+QUERIES = [
+    "vector search",
+    "postgres replication lag",
+    "langchain agents with memory",
+    "kubernetes autoscaling latency python",
+    "quixotic",
+]
+
+
+def latency(index: DocumentIndex, query: str):
+    times = []
+    for _ in range(200):
+        start = time.perf_counter()
+        hits = index.query(query)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)], hits
+
+
+def make_corpus(n: int, rng: random.Random):
+    vocab = [
+        "vector", "search", "postgres", "replication", "lag", "langchain", "agents", "memory",
+        "kubernetes", "autoscaling", "latency", "python",
+    ] + [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+        for _ in range(30000)
+    ] + ["quixotic"]
+    # skewed towards the front of the vocabulary, a rough Zipf
+    pick = lambda: vocab[int(rng.random() ** 3 * len(vocab))]
+    for i in range(n):
+        title = " ".join(pick() for _ in range(5))
+        yield i + 1, title, " ".join(pick() for _ in range(WORDS_PER_DOC))
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as path:
+        index = DocumentIndex(path=path, max_postings=0)
+
+        # like load_document_index: 10k-row batches, one merge at the end
+        corpus = list(make_corpus(BENCH_DOCS, rng))
+        start = time.perf_counter()
+        for i in range(0, len(corpus), 10_000):
+            index.add_many(corpus[i:i + 10_000], merge=False)
+        index.merge()
+        print(f"built {len(index)} documents in {time.perf_counter() - start:.1f} s, {index.metrics()}")
+
+        start = time.perf_counter()
+        reopened = DocumentIndex(path=path, max_postings=0)
+        reopened.load()
+        print(f"reopened (memory-mapped) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        reopened.add(BENCH_DOCS + 1, "quixotic postgres notes", "a freshly saved report about postgres")
+        print(f"added one document in {(time.perf_counter() - start) * 1000:.2f} ms")
+        extra = list(make_corpus(reopened.merge_every, rng))
+        start = time.perf_counter()
+        for doc_id, title, content in extra[:-1]:
+            reopened.add(BENCH_DOCS + 1 + doc_id, title, content)
+        print(f"added {reopened.merge_every} documents, including one merge, in {time.perf_counter() - start:.2f} s\n")
+
+        cut = DocumentIndex(path=path, max_postings=BENCH_MAX_POSTINGS)
+        cut.load()
+        print(f"median / p99 ms; cut-off = {BENCH_MAX_POSTINGS} postings per term\n")
+        print(f"{'query':>40} | {'exact':>13} | {'cut-off':>13} | top 5 kept | top hit")
+        for query in QUERIES:
+            median, p99, hits = latency(reopened, query)
+            cut_median, cut_p99, cut_hits = latency(cut, query)
+            kept = len({h["id"] for h in hits} & {h["id"] for h in cut_hits})
+            top = hits[0]["title"] if hits else "-"
+            print(
+                f"{query:>40} | {median:>6.2f} {p99:>6.2f} | {cut_median:>6.2f} {cut_p99:>6.2f}"
+                f" | {kept:>7}/{len(hits)} | {top}"
+            )
@@ -0,0 +1,143 @@
+# search_postgres latency before and after migrations/001_documents_search_vector.sql
+# on a generated corpus (default 1M documents) in a scratch table,
+# bench_documents, next to the real one.
+#
+#   before          the old query: to_tsvector() per row, unordered LIMIT 5
+#   before ranked   the same scan ordered by ts_rank_cd (what ranking would cost without the column)
+#   after           SEARCH_QUERY: stored search_vector + GIN, ts_rank_cd order, ts_headline snippets
+#
+# run from the repo root:  python -m benchmarks.bench_postgres_search
+# BENCH_DOCS sets the corpus size, BENCH_KEEP=1 keeps the table for the next run.
+
+import os
+import time
+import random
+import statistics
+
+import psycopg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.getenv("DB_URL")
+BENCH_DOCS = int(os.getenv("BENCH_DOCS", "1000000"))
+BENCH_KEEP = os.getenv("BENCH_KEEP", "0") == "1"
+TABLE = "bench_documents"
+MIGRATION = "migrations/001_documents_search_vector.sql"
+REPEAT = 5
+
+TOPICS = [
+    "vector search",          # common terms
+    "postgres replication",
+    "langchain agents memory",
+    "kubernetes autoscaling latency",
+    "quixotic",               # a rare term
+]
+
+OLD_QUERY = f"""
+SELECT title, content
+FROM {TABLE}
+WHERE to_tsvector('english', content) @@ plainto_tsquery('english', %s)
+LIMIT 5;
+"""
+
+OLD_RANKED_QUERY = f"""
+SELECT title, left(content, 300)
+FROM {TABLE}
+WHERE to_tsvector('english', content) @@ plainto_tsquery('english', %s)
+ORDER BY ts_rank_cd(to_tsvector('english', content), plainto_tsquery('english', %s)) DESC
+LIMIT 5;
+"""
+
+
+def vocabulary(rng: random.Random):
+    seed = [
+        "vector", "search", "postgres", "replication", "langchain", "agents", "memory",
+        "kubernetes", "autoscaling", "latency", "index", "query", "python", "model",
+        "retrieval", "embedding", "graph", "cache", "stream", "token",
+    ]
+    filler = {
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+        for _ in range(20000)
+    }
+    # index order is frequency order: the generator below favours low indices
+    return seed + sorted(filler) + ["quixotic"]
+
+
+def populate(conn: psycopg.Connection, words):
+    have = conn.execute(f"SELECT to_regclass('{TABLE}') IS NOT NULL").fetchone()[0]
+    if have and conn.execute(f"SELECT count(*) FROM {TABLE}").fetchone()[0] >= BENCH_DOCS:
+        return
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.execute(f"CREATE TABLE {TABLE} (id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY, title text, content text)")
+
+    batch = 100_000
+    for start in range(0, BENCH_DOCS, batch):
+        n = min(batch, BENCH_DOCS - start)
+        # power(random(), 3) skews picks towards the front of the vocabulary (a rough Zipf)
+        conn.execute(
+            f"""
+            INSERT INTO {TABLE} (title, content)
+            SELECT
+                (SELECT string_agg((%(w)s::text[])[1 + floor(power(random(), 3) * %(n)s)::int], ' ')
+                   FROM generate_series(1, 4 + mod(g, 3))),
+                (SELECT string_agg((%(w)s::text[])[1 + floor(power(random(), 3) * %(n)s)::int], ' ')
+                   FROM generate_series(1, 150 + mod(g, 100)))
+            FROM generate_series(1, %(rows)s) AS g
+            """,
+            {"w": words, "n": len(words), "rows": n},
+        )
+        print(f"  inserted {start + n}/{BENCH_DOCS}")
+    conn.execute(f"ANALYZE {TABLE}")
+
+
+def reset(conn: psycopg.Connection):
+    conn.execute(f"DROP INDEX IF EXISTS {TABLE}_search_vector_idx")
+    conn.execute(f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector")
+
+
+def migrate(conn: psycopg.Connection) -> float:
+    with open(MIGRATION) as f:
+        statements = [
+            s.strip() for s in
+            "\n".join(l for l in f.read().splitlines() if not l.startswith("--")).split(";")
+            if s.strip()
+        ]
+    start = time.perf_counter()
+    for statement in statements:
+        conn.execute(statement.replace("documents", TABLE))
+    return time.perf_counter() - start
+
+
+def latency(conn: psycopg.Connection, query: str, params) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    from services.db_query_demo import SEARCH_QUERY, HEADLINE_OPTIONS
+
+    rng = random.Random(0)
+    with psycopg.connect(DB_URL, autocommit=True) as conn:
+        print(f"populating {TABLE} with {BENCH_DOCS} documents ...")
+        populate(conn, vocabulary(rng))
+        reset(conn)
+
+        before = {t: latency(conn, OLD_QUERY, (t,)) for t in TOPICS}
+        before_ranked = {t: latency(conn, OLD_RANKED_QUERY, (t, t)) for t in TOPICS}
+
+        print(f"applying {MIGRATION} ...")
+        print(f"  took {migrate(conn):.1f} s")
+        after = {t: latency(conn, SEARCH_QUERY.replace("documents", TABLE), (t, HEADLINE_OPTIONS)) for t in TOPICS}
+
+        print(f"\nmedian of {REPEAT} runs, ms\n")
+        print(f"{'topic':>32} | {'before':>9} | {'before ranked':>13} | {'after':>9}")
+        for t in TOPICS:
+            print(f"{t:>32} | {before[t]:>9.1f} | {before_ranked[t]:>13.1f} | {after[t]:>9.2f}")
+
+        if not BENCH_KEEP:
+            conn.execute(f"DROP TABLE {TABLE}")
@@ -0,0 +1,125 @@
+# Wall time and request count of the contents-API walker (fetch_repo_files)
+# against the git-trees fetcher (fetch_repo_files_tree) on a local fixture
+# repository served by a minimal fake GitHub API with simulated latency.
+#
+# run from the repo root:  python -m benchmarks.bench_repo_fetch [path/to/local/repo]
+# (uses the same .env as the g.py pipeline; no request leaves the machine)
+
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+LATENCY_MS = float(os.getenv("BENCH_LATENCY_MS", "30"))
+OWNER, REPO, BRANCH = "bench", "fixture", "main"
+
+
+def make_fixture(root: str, packages=20, modules=10):
+    for p in range(packages):
+        pkg = os.path.join(root, f"pkg_{p}", "sub")
+        os.makedirs(pkg, exist_ok=True)
+        for m in range(modules):
+            with open(os.path.join(pkg, f"mod_{m}.py"), "w") as f:
+                f.write(f"def f_{p}_{m}(x):\n    return x * {m}\n" * 20)
+        with open(os.path.join(root, f"pkg_{p}", "README.md"), "w") as f:
+            f.write("docs\n")
+
+
+def blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    root = ""
+    requests = 0
+    blobs = {}
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(LATENCY_MS / 1000)
+        url = urlparse(self.path)
+        prefix = f"/repos/{OWNER}/{REPO}/"
+        rest = url.path[len(prefix):]
+
+        if rest.startswith("contents"):
+            rel = rest[len("contents"):].strip("/")
+            full = os.path.join(self.root, rel)
+            if os.path.isdir(full):
+                self.reply([
+                    {"name": n, "path": f"{rel}/{n}".strip("/"),
+                     "type": "dir" if os.path.isdir(os.path.join(full, n)) else "file"}
+                    for n in sorted(os.listdir(full))
+                ])
+            else:
+                with open(full, "rb") as f:
+                    data = f.read()
+                self.reply({"type": "file", "path": rel, "content": base64.b64encode(data).decode()})
+        elif rest.startswith("git/trees"):
+            tree = []
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                for d in dirnames:
+                    tree.append({"path": os.path.relpath(os.path.join(dirpath, d), self.root), "type": "tree"})
+                for n in filenames:
+                    full = os.path.join(dirpath, n)
+                    with open(full, "rb") as f:
+                        data = f.read()
+                    sha = blob_sha(data)
+                    type(self).blobs[sha] = data
+                    tree.append({"path": os.path.relpath(full, self.root), "type": "blob", "sha": sha, "size": len(data)})
+            self.reply({"tree": tree, "truncated": False})
+        elif rest.startswith("git/blobs/"):
+            data = self.blobs[rest.rsplit("/", 1)[1]]
+            self.reply({"encoding": "base64", "content": base64.b64encode(data).decode()})
+        else:
+            self.reply({"message": "Not Found"}, status=404)
+
+
+def run(label, fn):
+    FakeGitHub.requests = 0
+    start = time.perf_counter()
+    files = fn(OWNER, REPO, branch=BRANCH)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {len(files):>6} files {FakeGitHub.requests:>7} requests {elapsed:>8.2f} s")
+    return files
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        root = sys.argv[1] if len(sys.argv) > 1 else tmp
+        if root == tmp:
+            make_fixture(tmp)
+        FakeGitHub.root = root
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["GITHUB_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+        from services.g import fetch_repo_files, fetch_repo_files_tree
+        from services.summary_cache import SummaryCache
+
+        # a fresh blob cache per run, so the tree fetcher downloads every blob
+        # and the real .cache/summary_cache.sqlite3 is left alone
+        cache = SummaryCache(os.path.join(tmp, "summary_cache.sqlite3"))
+
+        print(f"simulated latency {LATENCY_MS:.0f} ms per request\n")
+        walked = run("contents walker", fetch_repo_files)
+        treed = run("git trees + blobs", lambda *a, **kw: fetch_repo_files_tree(*a, cache=cache, **kw))
+        print("\nsame files and contents:", walked == treed)
+        server.shutdown()
@@ -0,0 +1,62 @@
+# Prompt size and pre-filter latency of the orchestrator prompt with and
+# without the BM25 top-K title filter. LLM latency is not measured here; it
+# grows with the ~tokens column (1 token ~ 4 characters).
+#
+# run from the repo root:  python -m benchmarks.bench_title_index
+
+import random
+import time
+
+from services.orc_demo import orchestrator_prompts
+from services.title_index import TitleIndex, DB_TITLES_TOP_K
+
+TOPIC = "Explain langchain agents with postgres vector search"
+SIZES = [10, 10_000, 100_000]
+
+SEED_WORDS = [
+    "langchain", "postgres", "vector", "search", "agents", "retrieval", "rag",
+    "llm", "embedding", "transformer", "graph", "python", "rust", "kubernetes",
+    "docker", "mountains", "climate", "finance", "fastapi", "streaming",
+]
+
+
+def make_titles(n: int, rng: random.Random):
+    vocab = SEED_WORDS + [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+        for _ in range(5000)
+    ]
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(2, 6))) for _ in range(n)]
+
+
+def prompt_chars(titles):
+    messages = orchestrator_prompts.format_messages(user_content=TOPIC, db_content=titles)
+    return sum(len(m.content) for m in messages)
+
+
+def timed(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    print(f"top-k = {DB_TITLES_TOP_K}, topic = {TOPIC!r}\n")
+    print(f"{'titles':>8} | {'full prompt chars':>17} | {'~tokens':>8} | {'format ms':>9} || "
+          f"{'top-k chars':>11} | {'~tokens':>7} | {'build ms':>8} | {'query ms':>8} | {'format ms':>9}")
+
+    for n in SIZES:
+        titles = make_titles(n, rng)
+
+        full_chars, full_ms = timed(lambda: prompt_chars(titles), repeat=3)
+
+        start = time.perf_counter()
+        index = TitleIndex(titles)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        top, query_ms = timed(lambda: index.top_k(TOPIC, DB_TITLES_TOP_K))
+        top_chars, top_ms = timed(lambda: prompt_chars(top))
+
+        print(f"{n:>8} | {full_chars:>17} | {full_chars // 4:>8} | {full_ms:>9.2f} || "
+              f"{top_chars:>11} | {top_chars // 4:>7} | {build_ms:>8.1f} | {query_ms:>8.3f} | {top_ms:>9.3f}")
@@ -0,0 +1,85 @@
+# Query latency of plain rg over whole checkouts against the trigram
+# pre-filter (services/mco/trigram_index.py) + rg over the candidate files,
+# on a local corpus of checked-out repos (one subdirectory per repo).
+#
+# run from the repo root:  python -m benchmarks.bench_trigram_index [path/to/corpus]
+# (defaults to repo_cache; needs rg on PATH for the rg columns)
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+from services.mco.trigram_index import TrigramIndex
+
+QUERIES = [
+    "def __init__",
+    "import numpy",
+    r"class \w+Error",
+    "async def",
+    "TODO",
+    "raise ValueError",
+    r"self\.session\.get\(",
+    "zzz_no_such_symbol",
+]
+REPEAT = 5
+
+
+def rg_lines(paths, query):
+    proc = subprocess.run(
+        ["rg", query, *paths, "--with-filename", "--line-number", "--no-heading"],
+        capture_output=True,
+    )
+    return proc.stdout.count(b"\n")
+
+
+def timed(fn, repeat=REPEAT):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "repo_cache"
+    repos = sorted(
+        os.path.join(corpus, d) for d in os.listdir(corpus)
+        if not d.startswith(".") and os.path.isdir(os.path.join(corpus, d))
+    )
+    have_rg = shutil.which("rg") is not None
+    if not have_rg:
+        print("rg not found on PATH, only index timings are reported\n")
+
+    with tempfile.TemporaryDirectory() as index_root:
+        indexes = {}
+        for repo in repos:
+            index = TrigramIndex(repo, os.path.join(index_root, os.path.basename(repo)))
+            stats = index.refresh()
+            _, reopen_ms = timed(lambda: TrigramIndex(repo, index.index_dir)._load())
+            _, noop_ms = timed(lambda: index.refresh(), repeat=1)
+            indexes[repo] = index
+            print(f"{os.path.basename(repo)}: {stats['files']} files, build {stats['ms']} ms, "
+                  f"open (mmap) {reopen_ms:.2f} ms, incremental no-op refresh {noop_ms:.0f} ms")
+
+        print(f"\n{'query':>24} | {'candidates':>10} | {'filter ms':>9} | {'rg ms':>8} | "
+              f"{'index+rg ms':>11} | {'lines':>6} | {'same':>4}")
+        total_files = sum(len(i.meta["files"]) for i in indexes.values())
+        for query in QUERIES:
+            def narrow():
+                found = []
+                for repo, index in indexes.items():
+                    candidates = index.candidates(query)
+                    found.extend([repo] if candidates is None else [os.path.join(repo, p) for p in candidates])
+                return found
+
+            paths, filter_ms = timed(narrow)
+            row = f"{query:>24} | {len(paths):>5}/{total_files:<4} | {filter_ms:>9.3f} | "
+            if have_rg:
+                full, rg_ms = timed(lambda: rg_lines(repos, query))
+                narrowed, narrowed_ms = timed(lambda: rg_lines(paths, query) if paths else 0)
+                row += f"{rg_ms:>8.1f} | {filter_ms + narrowed_ms:>11.1f} | {full:>6} | {str(full == narrowed):>4}"
+            else:
+                row += f"{'n/a':>8} | {'n/a':>11} | {'n/a':>6} | {'n/a':>4}"
+            print(row)
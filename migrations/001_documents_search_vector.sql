@@ -0,0 +1,21 @@
+-- Precomputed full-text search vector for documents, used by search_postgres
+-- (services/db_query_demo.py). Title terms weigh more than body terms.
+--
+-- apply:  psql "$DB_URL" -f migrations/001_documents_search_vector.sql
+--
+-- Adding a STORED generated column rewrites the table once under an
+-- ACCESS EXCLUSIVE lock; the index is then built without blocking writes.
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction, so do not
+-- wrap this file in BEGIN/COMMIT (psql -1).
+
+ALTER TABLE documents
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_search_vector_idx
+    ON documents USING GIN (search_vector);
+
+ANALYZE documents;
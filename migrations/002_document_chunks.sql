@@ -0,0 +1,38 @@
+-- Passage-level search: each saved document is also stored as chunks with
+-- their own search vector, written by save_db_node (services/document_chunks.py).
+--
+-- apply:  psql "$DB_URL" -f migrations/002_document_chunks.sql
+-- then index documents saved before this migration:
+--         python -m services.document_chunks --backfill
+
+-- chunks point at documents.id. If there is no id column it is added: as the
+-- primary key, or only UNIQUE when documents already has another primary key.
+-- An existing id column is used as is; it must be unique (primary key or
+-- unique constraint) or the foreign key below is rejected.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'documents' AND column_name = 'id'
+    ) THEN
+        IF EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'documents'::regclass AND contype = 'p') THEN
+            ALTER TABLE documents ADD COLUMN id bigint GENERATED ALWAYS AS IDENTITY UNIQUE;
+        ELSE
+            ALTER TABLE documents ADD COLUMN id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY;
+        END IF;
+    END IF;
+END $$;
+
+-- search_vector is computed in the insert (title weight A, passage weight B);
+-- a generated column cannot see the parent title
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    document_id bigint NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    chunk_index integer NOT NULL,
+    content text NOT NULL,
+    search_vector tsvector NOT NULL,
+    UNIQUE (document_id, chunk_index)
+);
+
+CREATE INDEX IF NOT EXISTS document_chunks_search_vector_idx
+    ON document_chunks USING GIN (search_vector);
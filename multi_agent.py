@@ -11,7 +11,7 @@ from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from services.web_search_agent_demo import web_search, web_search_agent_model, web_agent
 from services.github_search_agent_demo import search_github, search_github_tool, github_agent
 from services.db_query_demo import db_model, postgres_agent, search_postgres, get_pg_connection
-from services.orc_demo import orchestrator_model, orchestrator_prompts
+from services.orc_demo import orchestrator_model, legacy_orchestrator_prompts
 from services.make_pretty_output import pretty
 from services.text_splitter import split_text_into_chunks
 
@@ -55,7 +55,7 @@ def ask_topic_node(state: AgentState):
 def orchestrator_node(state: AgentState):
 
     response = orchestrator_model.invoke(
-        orchestrator_prompts.format_messages(
+        legacy_orchestrator_prompts.format_messages(
             user_content=state['content_to_research'],
             db_content=state['db_titles']
         )
@@ -0,0 +1,250 @@
+import os
+import json
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from langgraph.types import Command
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+from agent import graph, initial_state, summary_token, langfuse_handler, CHECKPOINTER_DB_URL
+from services.blocking import configure_event_loop
+from services.db_pool import close_pool, pool_metrics
+from services.title_cache import title_cache
+from services.fast_router import fast_router
+from services.research_cache import research_cache
+from services.tool_cache import tool_cache
+from services.mco.client_pool import mcp_pool
+from services.document_index import document_index, load_document_index
+
+# Multi-session HTTP front end for the research graph.
+#
+#   POST /research                      {"topic": "..."}  -> {"thread_id": ...}
+#   GET  /research/{thread_id}          status, pending question, summary
+#   GET  /research/{thread_id}/events   server-sent events while the graph runs,
+#                                       including final report tokens
+#   POST /research/{thread_id}/resume   {"value": "yes" | "no" | next topic}
+#   GET  /metrics
+#
+# run:  python server.py
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+
+# Graph runs executing at the same time; extra runs queue until a slot frees
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "200"))
+CHECKPOINTER_POOL_MAX_SIZE = int(os.getenv("CHECKPOINTER_POOL_MAX_SIZE", "20"))
+
+
+class StartResearch(BaseModel):
+    topic: str
+
+
+class ResumeResearch(BaseModel):
+    value: str
+
+
+class SessionRun:
+    """
+    A graph run in progress for one thread and the SSE clients following it.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers: List[asyncio.Queue] = []
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def publish(self, event: Optional[Dict[str, Any]]):
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+
+sessions: Dict[str, SessionRun] = {}
+run_slots = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+
+
+def session_config(thread_id: str) -> Dict[str, Any]:
+    return {
+        "configurable": {"thread_id": thread_id},
+        "callbacks": [langfuse_handler],
+    }
+
+
+def describe(thread_id: str, snapshot, running: bool) -> Dict[str, Any]:
+    if running:
+        status = "running"
+    elif snapshot.interrupts:
+        status = "waiting"
+    else:
+        status = "done"
+
+    values = snapshot.values
+    return {
+        "thread_id": thread_id,
+        "status": status,
+        "interrupt": snapshot.interrupts[0].value if status == "waiting" else None,
+        "content_to_research": values.get("content_to_research", ""),
+        "node_to_call": values.get("node_to_call", []),
+        "final_research_summary": values.get("final_research_summary", ""),
+    }
+
+
+async def session_status(workflow, thread_id: str) -> Dict[str, Any]:
+    snapshot = await workflow.aget_state(session_config(thread_id))
+    run = sessions.get(thread_id)
+    running = run is not None and run.running
+    # a just-started run may not have written its first checkpoint yet
+    if not snapshot.values and not running:
+        raise HTTPException(status_code=404, detail="Unknown research thread")
+
+    return describe(thread_id, snapshot, running)
+
+
+async def run_graph(workflow, thread_id: str, inputs: List[Any]):
+    run = sessions[thread_id]
+    config = session_config(thread_id)
+
+    async with run_slots:
+        try:
+            for graph_input in inputs:
+                async for mode, chunk in workflow.astream(
+                    graph_input, config, stream_mode=["updates", "messages"]
+                ):
+                    if mode == "messages":
+                        token = summary_token(*chunk)
+                        if token:
+                            run.publish({"event": "token", "data": token})
+                        continue
+
+                    for node, update in chunk.items():
+                        if node == "__interrupt__":
+                            run.publish({"event": "interrupt", "data": update[0].value})
+                        else:
+                            run.publish({"event": "update", "node": node, "data": update})
+            snapshot = await workflow.aget_state(config)
+            run.publish({"event": "status", "data": describe(thread_id, snapshot, running=False)})
+        except Exception as e:
+            print(f"Research thread {thread_id} failed: {e}")
+            run.publish({"event": "error", "data": str(e)})
+        finally:
+            run.publish(None)
+            # finished runs are served from the checkpointer from now on
+            if sessions.get(thread_id) is run:
+                del sessions[thread_id]
+
+
+def start_run(workflow, thread_id: str, inputs: List[Any]):
+    run = sessions.setdefault(thread_id, SessionRun())
+    if run.running:
+        raise HTTPException(status_code=409, detail="Research thread is already running")
+    run.task = asyncio.create_task(run_graph(workflow, thread_id, inputs))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_event_loop()
+
+    # one pooled checkpointer shared by every session, so checkpoint writes
+    # of concurrent runs don't queue behind a single connection
+    checkpointer_pool = AsyncConnectionPool(
+        conninfo=CHECKPOINTER_DB_URL,
+        max_size=CHECKPOINTER_POOL_MAX_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    await checkpointer_pool.open()
+    await load_document_index()
+
+    app.state.workflow = graph.compile(checkpointer=AsyncPostgresSaver(checkpointer_pool))
+    try:
+        yield
+    finally:
+        for run in sessions.values():
+            if run.running:
+                run.task.cancel()
+        await title_cache.close()
+        await mcp_pool.close()
+        await close_pool()
+        await checkpointer_pool.close()
+
+
+app = FastAPI(title="Multi-Agent Research Orchestrator", lifespan=lifespan)
+
+
+@app.post("/research", status_code=202)
+async def start_research(body: StartResearch):
+    thread_id = f"research-{uuid.uuid4()}"
+    # first input runs up to the ask_topic interrupt, the second answers it
+    start_run(app.state.workflow, thread_id, [initial_state(), Command(resume=body.topic)])
+    return {"thread_id": thread_id}
+
+
+@app.get("/research/{thread_id}")
+async def get_research(thread_id: str):
+    return await session_status(app.state.workflow, thread_id)
+
+
+@app.post("/research/{thread_id}/resume", status_code=202)
+async def resume_research(thread_id: str, body: ResumeResearch):
+    status = await session_status(app.state.workflow, thread_id)
+    if status["status"] != "waiting":
+        raise HTTPException(status_code=409, detail=f"Research thread is {status['status']}")
+    start_run(app.state.workflow, thread_id, [Command(resume=body.value)])
+    return {"thread_id": thread_id}
+
+
+@app.get("/research/{thread_id}/events")
+async def research_events(thread_id: str):
+    run = sessions.get(thread_id)
+    if run is None or not run.running:
+        status = await session_status(app.state.workflow, thread_id)
+        run = None
+    else:
+        status = None
+
+    queue: asyncio.Queue = asyncio.Queue()
+    if run is not None:
+        run.subscribers.append(queue)
+
+    async def stream():
+        try:
+            if run is None:
+                yield f"data: {json.dumps({'event': 'status', 'data': status}, default=str)}\n\n"
+                return
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+        finally:
+            if run is not None:
+                run.subscribers.remove(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "running_sessions": sum(1 for run in sessions.values() if run.running),
+        "db_pool": pool_metrics(),
+        "router": fast_router.metrics(),
+        "research_cache": research_cache.metrics(),
+        "tool_cache": tool_cache.metrics(),
+        "mcp_pool": mcp_pool.metrics(),
+        "document_index": document_index.metrics(),
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
@@ -0,0 +1,60 @@
+import os
+import asyncio
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Size of the pool that runs sync I/O (requests, sync SDKs) off the event loop
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "16"))
+
+# LOOP_DEBUG=1 logs every callback that holds the event loop longer than LOOP_BLOCK_WARN_MS
+LOOP_DEBUG = os.getenv("LOOP_DEBUG", "0") == "1"
+LOOP_BLOCK_WARN_MS = float(os.getenv("LOOP_BLOCK_WARN_MS", "100"))
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a sync call on the bounded I/O pool and await its result.
+    Context vars (tracing, callbacks) are carried into the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+
+def to_async(func: Callable) -> Callable:
+    """
+    Async twin of a sync function, for Tool(coroutine=...).
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+    return wrapper
+
+
+def configure_event_loop(debug: bool = LOOP_DEBUG, block_warn_ms: float = LOOP_BLOCK_WARN_MS):
+    """
+    Call once from inside the running loop.
+
+    Makes the bounded pool the loop's default executor, so asyncio.to_thread
+    and LangChain's run_in_executor fallback for sync tools share the same
+    limit, and optionally turns on slow-callback detection.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(_executor)
+
+    if debug:
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.WARNING)
+        logging.getLogger("asyncio").setLevel(logging.WARNING)
+        loop.set_debug(True)
+        loop.slow_callback_duration = block_warn_ms / 1000
+        print(f"Event loop debug on: flagging calls that block the loop for more than {block_warn_ms:.0f} ms")
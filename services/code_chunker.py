@@ -0,0 +1,105 @@
+import io
+import os
+import ast
+from typing import List, Tuple
+
+# Chunk budget in tokens (1 token ~ 4 characters)
+CODE_CHUNK_TOKENS = int(os.getenv("CODE_CHUNK_TOKENS", "400"))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _pack(segments: List[List[str]], budget_chars: int) -> List[List[str]]:
+    """
+    Greedily join whole segments (lists of lines) while they fit the budget.
+    A segment larger than the budget is split on line boundaries.
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+
+    for segment in segments:
+        seg_size = sum(len(line) for line in segment)
+
+        if seg_size > budget_chars:
+            if current:
+                chunks.append(current)
+                current, size = [], 0
+            # oversized function or class: fall back to lines inside it
+            chunks.extend(_pack([[line] for line in segment], budget_chars) if len(segment) > 1 else [segment])
+            continue
+
+        if size + seg_size > budget_chars and current:
+            chunks.append(current)
+            current, size = [], 0
+        current.extend(segment)
+        size += seg_size
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _python_segments(text: str, lines: List[str]) -> List[List[str]]:
+    """
+    One segment per top-level statement. Decorators and the comments or
+    blank lines above a definition travel with it.
+    """
+    tree = ast.parse(text)
+    starts = []
+    for node in tree.body:
+        first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        starts.append(first - 1)
+
+    if not starts:
+        return [lines]
+
+    # leading comments/blank lines belong to the statement below them
+    bounds = []
+    for start in starts:
+        while start > 0 and (not lines[start - 1].strip() or lines[start - 1].lstrip().startswith("#")):
+            start -= 1
+        bounds.append(start)
+    bounds[0] = 0
+
+    segments = []
+    for i, start in enumerate(bounds):
+        end = bounds[i + 1] if i + 1 < len(bounds) else len(lines)
+        if end > start:
+            segments.append(lines[start:end])
+    return segments
+
+
+def chunk_code_spans(text: str, path: str = "", max_tokens: int = CODE_CHUNK_TOKENS) -> List[Tuple[int, str]]:
+    """
+    Split source into chunks of whole top-level functions and classes for
+    Python, whole lines for anything else (or Python that does not parse).
+    Chunks never overlap. Returns [(character offset, chunk)].
+    """
+    # split on "\n" only, like ast's line numbers; str.splitlines also breaks on
+    # \f, \v, \x1c-\x1e, \x85, \u2028 and \u2029, which shifts every later lineno
+    lines = io.StringIO(text, newline="\n").readlines()
+    budget_chars = max_tokens * 4
+
+    segments = None
+    if path.endswith(".py") or not path:
+        try:
+            segments = _python_segments(text, lines)
+        except (SyntaxError, ValueError):
+            segments = None
+    if segments is None:
+        segments = [[line] for line in lines]
+
+    spans = []
+    offset = 0
+    for chunk_lines in _pack(segments, budget_chars):
+        chunk = "".join(chunk_lines)
+        spans.append((offset, chunk))
+        offset += len(chunk)
+    return spans
+
+
+def chunk_code(text: str, path: str = "", max_tokens: int = CODE_CHUNK_TOKENS) -> List[str]:
+    return [chunk for _, chunk in chunk_code_spans(text, path, max_tokens)]
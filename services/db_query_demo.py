@@ -1,6 +1,7 @@
 import os
 import psycopg2
 from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 from langchain.agents import create_agent
@@ -10,6 +11,10 @@ from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 import os
 from langfuse.langchain import CallbackHandler
 
+from services.db_pool import pg_connection
+from services.blocking import to_async
+from services.document_index import document_index, DOC_INDEX_ENABLED
+
 load_dotenv()
 
 langfuse_handler = CallbackHandler()
@@ -20,45 +25,140 @@ langfuse_handler = CallbackHandler()
 
 
 
+# one-off sync connection, kept for the legacy multi_agent.py graph
 def get_pg_connection():
     return psycopg2.connect(os.getenv("DB_URL"))
 
 
 
-@tool
-def search_postgres(topic: str) -> str:
-    """
-    Search for documents related to a topic in PostgreSQL.
-    """
-    conn = get_pg_connection()
-    cur = conn.cursor()
-
-    query = """
-    SELECT title, content
-    FROM documents
-    WHERE to_tsvector('english', content)
-          @@ plainto_tsquery('english', %s)
-    LIMIT 5;
-    """
-
-    cur.execute(query, (topic,))
-    rows = cur.fetchall()
-
-    cur.close()
-    conn.close()
-
+# Best passages across all documents (migrations/002_document_chunks.sql),
+# merged by rank with whole-document hits (ts_headline snippets) for rows
+# that have no chunks: saved by multi_agent.py or not backfilled yet.
+PASSAGE_QUERY = """
+WITH q AS (SELECT plainto_tsquery('english', %(topic)s) AS query),
+passages AS (
+    SELECT document_id, content, ts_rank_cd(search_vector, q.query) AS rank
+    FROM document_chunks, q
+    WHERE search_vector @@ q.query
+    ORDER BY rank DESC
+    LIMIT %(limit)s
+),
+unchunked AS (
+    SELECT d.title, d.content, ts_rank_cd(d.search_vector, q.query) AS rank
+    FROM documents d, q
+    WHERE d.search_vector @@ q.query
+      AND NOT EXISTS (SELECT 1 FROM document_chunks c WHERE c.document_id = d.id)
+    ORDER BY rank DESC
+    LIMIT %(limit)s
+)
+SELECT title, snippet FROM (
+    SELECT d.title, p.content AS snippet, p.rank
+    FROM passages p JOIN documents d ON d.id = p.document_id
+    UNION ALL
+    SELECT u.title, ts_headline('english', u.content, q.query, %(headline)s), u.rank
+    FROM unchunked u, q
+) AS hits
+ORDER BY rank DESC
+LIMIT %(limit)s;
+"""
+
+SEARCH_PASSAGES = int(os.getenv("SEARCH_PASSAGES", "5"))
+
+# Whole documents only, the search before passages; kept for
+# benchmarks/bench_postgres_search.py. Relies on
+# migrations/001_documents_search_vector.sql (search_vector + GIN index).
+# Only the top rows get a ts_headline, it re-parses the whole document.
+SEARCH_QUERY = """
+WITH q AS (SELECT plainto_tsquery('english', %s) AS query)
+SELECT
+    top.title,
+    ts_headline('english', top.content, q.query, %s) AS snippet
+FROM (
+    SELECT title, content, ts_rank_cd(search_vector, q.query) AS rank
+    FROM documents, q
+    WHERE search_vector @@ q.query
+    ORDER BY rank DESC
+    LIMIT 5
+) AS top, q
+ORDER BY top.rank DESC;
+"""
+
+HEADLINE_OPTIONS = "MaxFragments=2, MinWords=15, MaxWords=40, FragmentDelimiter=' ... '"
+
+
+def passage_params(topic: str) -> dict:
+    return {"topic": topic, "limit": SEARCH_PASSAGES, "headline": HEADLINE_OPTIONS}
+
+
+def format_results(rows) -> str:
     if not rows:
         return "No relevant data found in the database."
 
     results = []
-    for title, content in rows:
+    for title, passage in rows:
         results.append(
-            f"Title: {title}\nContent: {content[:300]}"
+            f"Title: {title}\nContent: {passage}"
         )
 
     return "\n\n".join(results)
 
 
+def search_postgres_sync(topic: str) -> str:
+    # same query over a one-off psycopg2 connection, for the sync legacy graph
+    conn = get_pg_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(PASSAGE_QUERY, passage_params(topic))
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+    return format_results(rows)
+
+
+async def asearch_postgres(topic: str) -> str:
+    async with pg_connection() as conn:
+        cur = await conn.execute(PASSAGE_QUERY, passage_params(topic))
+        rows = await cur.fetchall()
+    return format_results(rows)
+
+
+# async through the shared pool for agent.py, sync for multi_agent.py's .invoke
+search_postgres = StructuredTool.from_function(
+    func=search_postgres_sync,
+    coroutine=asearch_postgres,
+    name="search_postgres",
+    description=(
+        "Search for documents related to a topic in PostgreSQL. "
+        "Returns the best matching passages with their document title."
+    ),
+)
+
+
+def similar_documents(topic: str) -> str:
+    hits = document_index.query(topic)
+    if not hits:
+        return "No similar documents found."
+
+    return "\n".join(f"Title: {hit['title']} (score {hit['score']:.3f})" for hit in hits)
+
+
+search_similar_documents = StructuredTool.from_function(
+    func=similar_documents,
+    coroutine=to_async(similar_documents),
+    name="search_similar_documents",
+    description=(
+        "Find saved research documents similar to a topic, including ones that "
+        "do not share its exact words. Returns document titles with a similarity score."
+    ),
+)
+
+
+db_tools = [search_postgres]
+db_prompt_extra = ""
+if DOC_INDEX_ENABLED:
+    db_tools.append(search_similar_documents)
+    db_prompt_extra = "- Use search_similar_documents to find related saved documents, then search_postgres on their titles\n"
+
 
 db_model = ChatGroq(
     api_key=os.getenv("GROQ_API_KEY"),
@@ -70,15 +170,15 @@ db_model = ChatGroq(
 
 postgres_agent = create_agent(
     model=db_model,
-    tools=[search_postgres],
-    system_prompt="""
+    tools=db_tools,
+    system_prompt=f"""
 You are a professional database research agent.
 
 Your goal:
 - Given a topic, search it in the PostgreSQL database
 - Use the search_postgres tool to retrieve relevant data
 - If needed, call the tool multiple times but atmax 5 times
-- Remove irrelevant or duplicate content
+{db_prompt_extra}- Remove irrelevant or duplicate content
 - Return a clean, factual, research-ready response
 """,
 )
@@ -0,0 +1,92 @@
+import os
+import sys
+import asyncio
+from typing import List
+
+from dotenv import load_dotenv
+
+from services.db_pool import pg_connection, close_pool
+from services.text_splitter import split_text_into_chunks
+
+load_dotenv()
+
+# Passages stored per saved document (migrations/002_document_chunks.sql).
+# ~300 tokens each, so a handful of top passages stays small in the
+# postgres_agent prompt.
+DOC_CHUNK_CHARS = int(os.getenv("DOC_CHUNK_CHARS", "1200"))
+DOC_CHUNK_OVERLAP = int(os.getenv("DOC_CHUNK_OVERLAP", "150"))
+# documents chunked per transaction by --backfill
+DOC_BACKFILL_BATCH = int(os.getenv("DOC_BACKFILL_BATCH", "200"))
+
+# one statement for every chunk of a document
+INSERT_CHUNKS = """
+INSERT INTO document_chunks (document_id, chunk_index, content, search_vector)
+SELECT
+    %(document_id)s,
+    c.ord - 1,
+    c.content,
+    setweight(to_tsvector('english', coalesce(%(title)s::text, '')), 'A') ||
+    setweight(to_tsvector('english', c.content), 'B')
+FROM unnest(%(chunks)s::text[]) WITH ORDINALITY AS c(content, ord);
+"""
+
+
+def chunk_document(content: str) -> List[str]:
+    return split_text_into_chunks([content], chunk_size=DOC_CHUNK_CHARS, chunk_overlap=DOC_CHUNK_OVERLAP)
+
+
+async def insert_chunks(conn, document_id: int, title: str, content: str) -> int:
+    """
+    Chunk a document and write all its passages in one batched insert,
+    inside the caller's transaction.
+    """
+    chunks = chunk_document(content)
+    if chunks:
+        await conn.execute(INSERT_CHUNKS, {"document_id": document_id, "title": title, "chunks": chunks})
+    return len(chunks)
+
+
+async def backfill(batch: int = DOC_BACKFILL_BATCH):
+    """
+    Chunk documents that were saved before document_chunks existed.
+    Walks the table in id order a batch at a time, committing each batch,
+    so neither memory nor the open transaction grows with the table.
+    """
+    last_id = None
+    total = documents = 0
+    while True:
+        # keyset pagination; documents with no content never get chunks, so
+        # NOT EXISTS alone would return them again every batch
+        after = "" if last_id is None else "AND d.id > %(last_id)s"
+        async with pg_connection() as conn:
+            cur = await conn.execute(
+                f"""
+                SELECT d.id, d.title, d.content
+                FROM documents d
+                WHERE NOT EXISTS (SELECT 1 FROM document_chunks c WHERE c.document_id = d.id)
+                {after}
+                ORDER BY d.id
+                LIMIT %(batch)s
+                """,
+                {"last_id": last_id, "batch": batch},
+            )
+            rows = await cur.fetchall()
+            for document_id, title, content in rows:
+                total += await insert_chunks(conn, document_id, title, content or "")
+        if not rows:
+            break
+        documents += len(rows)
+        last_id = rows[-1][0]
+        print(f"backfilled {total} chunks for {documents} documents so far")
+    print(f"backfilled {total} chunks for {documents} documents")
+
+
+if __name__ == "__main__":
+    if "--backfill" in sys.argv:
+        async def main():
+            try:
+                await backfill()
+            finally:
+                await close_pool()
+
+        asyncio.run(main())
@@ -0,0 +1,316 @@
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services.db_pool import pg_connection
+from services.blocking import run_blocking
+from services.hashing_vectorizer import tokenize, hash_counts, smooth_idf
+
+load_dotenv()
+
+# Optional in-process similarity index over the documents table.
+#
+# DOC_INDEX_ENABLED=1       build/load it at startup and give postgres_agent the
+#                           search_similar_documents tool
+# DOC_INDEX_PATH            directory of the memory-mapped files
+# DOC_INDEX_DIM             hashed feature space
+# DOC_INDEX_MERGE_EVERY     documents buffered in memory before they are merged
+#                           into the on-disk matrix
+# DOC_INDEX_MAX_POSTINGS    if set, only this many highest-weighted documents are
+#                           read per query term: faster on common terms, but
+#                           approximate (0 = exact)
+DOC_INDEX_ENABLED = os.getenv("DOC_INDEX_ENABLED", "0") == "1"
+DOC_INDEX_PATH = os.getenv("DOC_INDEX_PATH", ".cache/document_index")
+DOC_INDEX_DIM = int(os.getenv("DOC_INDEX_DIM", str(2 ** 18)))
+DOC_INDEX_MERGE_EVERY = int(os.getenv("DOC_INDEX_MERGE_EVERY", "256"))
+DOC_INDEX_TOP_K = int(os.getenv("DOC_INDEX_TOP_K", "5"))
+DOC_INDEX_MAX_POSTINGS = int(os.getenv("DOC_INDEX_MAX_POSTINGS", "0"))
+
+
+class DocumentIndex:
+    """
+    Hashed TF-IDF over title + content of every saved document.
+
+    Document vectors (l2-normalized log tf, float32) are stored transposed,
+    feature-major like a CSC matrix: for feature f, the documents that have
+    it and their weights sit at offsets[f]:offsets[f + 1], highest weight
+    first. A query only touches the few features it contains, and the
+    scores of all documents come out of one np.bincount (a sparse
+    matrix-vector product). IDF is applied on the query side from the live
+    df counts. With DOC_INDEX_MAX_POSTINGS set, only the head of each
+    feature's list is read, which bounds the cost of common terms.
+
+    New documents go to a small in-memory buffer (searchable right away)
+    and are merged into the memory-mapped arrays every
+    DOC_INDEX_MERGE_EVERY documents by a background thread, so add() never
+    waits for a merge.
+    """
+
+    def __init__(self, path: str = DOC_INDEX_PATH, dim: int = DOC_INDEX_DIM,
+                 merge_every: int = DOC_INDEX_MERGE_EVERY, max_postings: int = DOC_INDEX_MAX_POSTINGS):
+        self.path = path
+        self.dim = dim
+        self.merge_every = merge_every
+        self.max_postings = max_postings
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        # a background merge has been started and not finished yet
+        self._merging = False
+        self._reset()
+
+    def _reset(self):
+        self.doc_ids: List[int] = []
+        self.titles: List[str] = []
+        # ids commit out of order across sessions, so membership is tracked, not a high-water mark
+        self._ids: Set[int] = set()
+        self.df = np.zeros(self.dim, dtype=np.int32)
+        self.offsets = np.zeros(self.dim + 1, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int32)
+        self.weights = np.empty(0, dtype=np.float32)
+        self.merged_docs = 0
+        # feature -> (rows, weights) of documents not merged yet
+        self._pending: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._pending_docs: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        indices, counts = hash_counts(tokenize(text), self.dim)
+        weights = 1.0 + np.log(counts)
+        norm = np.linalg.norm(weights)
+        return indices, (weights / norm if norm else weights).astype(np.float32)
+
+    # ---------- writes ----------
+
+    def _add(self, doc_id: int, title: str, content: str, searchable: bool = True):
+        indices, weights = self.vectorize(f"{title} {content}")
+        row = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.titles.append(title)
+        self._ids.add(doc_id)
+        self.df[indices] += 1
+        if searchable:
+            for f, w in zip(indices.tolist(), weights.tolist()):
+                rows, ws = self._pending.setdefault(f, ([], []))
+                rows.append(row)
+                ws.append(w)
+        self._pending_docs.append((indices.astype(np.int32), weights))
+
+    def add(self, doc_id: int, title: str, content: str):
+        with self._lock:
+            if doc_id in self._ids:
+                return
+            self._add(doc_id, title, content)
+            full = len(self._pending_docs) >= self.merge_every and not self._merging
+            if full:
+                self._merging = True
+        if full:
+            threading.Thread(target=self._background_merge, name="document-index-merge", daemon=True).start()
+
+    def _background_merge(self):
+        # keeps going while saves outpace merges, so the buffer stays bounded
+        while True:
+            try:
+                self.merge()
+            except Exception as e:
+                # documents stay pending (and searchable) and are retried with the next merge
+                print(f"Document index merge failed: {e}")
+                with self._lock:
+                    self._merging = False
+                return
+            with self._lock:
+                if len(self._pending_docs) < self.merge_every:
+                    self._merging = False
+                    return
+
+    def add_many(self, documents: List[Tuple[int, str, str]], merge: bool = True):
+        """
+        Bulk load (startup, backfill). These documents skip the pending
+        buffer and become searchable with the next merge; pass merge=False
+        to load several batches and merge() once at the end.
+        """
+        with self._lock:
+            for doc_id, title, content in documents:
+                if doc_id not in self._ids:
+                    self._add(doc_id, title, content or "", searchable=False)
+        if merge:
+            self.merge()
+
+    def merge(self):
+        # the new arrays are built and written outside self._lock, so queries
+        # keep running on the old memory maps (and the pending buffer) until
+        # the swap; documents added meanwhile stay pending for the next merge
+        with self._merge_lock:
+            with self._lock:
+                docs = list(self._pending_docs)
+                if not docs:
+                    return
+                first = self.merged_docs
+                offsets, rows, weights = self.offsets, self.rows, self.weights
+                df = self.df.copy()
+                doc_ids = self.doc_ids[:first + len(docs)]
+                titles = self.titles[:first + len(docs)]
+
+            features = np.concatenate([indices for indices, _ in docs])
+            new_rows = np.concatenate([
+                np.full(len(indices), first + i, dtype=np.int32) for i, (indices, _) in enumerate(docs)
+            ])
+            new_weights = np.concatenate([ws for _, ws in docs])
+
+            # impact order: by feature, then by weight descending. The merged
+            # postings already are, so only the new ones are sorted and then
+            # inserted in one pass; weights are in [0, 1], so 2 * feature - weight
+            # is a single ascending key for that order
+            order = np.lexsort((-new_weights, features))
+            features, new_rows, new_weights = features[order], new_rows[order], new_weights[order]
+            counts = np.diff(np.asarray(offsets))
+            old_key = np.repeat(np.arange(self.dim, dtype=np.float64) * 2, counts)
+            old_key -= np.asarray(weights)
+            at = np.searchsorted(old_key, features * 2.0 - new_weights, side="right")
+            rows = np.insert(np.asarray(rows), at, new_rows)
+            weights = np.insert(np.asarray(weights), at, new_weights)
+
+            counts += np.bincount(features, minlength=self.dim)
+            offsets = np.zeros(self.dim + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            self._save(offsets, rows, weights, df, doc_ids, titles)
+
+            with self._lock:
+                self._open()
+                self.merged_docs = first + len(docs)
+                del self._pending_docs[:len(docs)]
+                self._pending.clear()
+                for row, (indices, ws) in enumerate(self._pending_docs, start=self.merged_docs):
+                    for f, w in zip(indices.tolist(), ws.tolist()):
+                        pending_rows, pending_ws = self._pending.setdefault(f, ([], []))
+                        pending_rows.append(row)
+                        pending_ws.append(w)
+
+    # ---------- persistence ----------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _save(self, offsets: np.ndarray, rows: np.ndarray, weights: np.ndarray,
+              df: np.ndarray, doc_ids: List[int], titles: List[str]):
+        # open memory maps keep reading the replaced files; docs.json goes last
+        # and records the posting count, so a torn write is detected by load()
+        os.makedirs(self.path, exist_ok=True)
+        for name, arr in (("offsets", offsets), ("rows", rows), ("weights", weights), ("df", df)):
+            np.save(self._file(f"{name}.tmp.npy"), arr)
+            os.replace(self._file(f"{name}.tmp.npy"), self._file(f"{name}.npy"))
+        with open(self._file("docs.json.tmp"), "w") as f:
+            json.dump({"dim": self.dim, "postings": len(rows), "doc_ids": doc_ids, "titles": titles}, f)
+        os.replace(self._file("docs.json.tmp"), self._file("docs.json"))
+
+    def _open(self):
+        self.offsets = np.load(self._file("offsets.npy"), mmap_mode="r")
+        self.rows = np.load(self._file("rows.npy"), mmap_mode="r")
+        self.weights = np.load(self._file("weights.npy"), mmap_mode="r")
+
+    def load(self) -> bool:
+        """
+        Open the persisted index, if any. Documents saved after it was last
+        merged have to be added again (see load_document_index).
+        """
+        with self._lock:
+            self._reset()
+            try:
+                with open(self._file("docs.json")) as f:
+                    docs = json.load(f)
+                if docs["dim"] != self.dim:
+                    return False
+                self._open()
+                self.df = np.load(self._file("df.npy"))
+                # every file is replaced on its own, so a torn write can mix generations
+                if (
+                    len(self.rows) != docs["postings"] or len(self.weights) != len(self.rows)
+                    or self.offsets[-1] != len(self.rows) or self.df.shape != (self.dim,)
+                ):
+                    raise ValueError("index files do not match docs.json")
+            except (OSError, ValueError, KeyError):
+                self._reset()
+                return False
+            self.doc_ids, self.titles = docs["doc_ids"], docs["titles"]
+            self._ids = set(self.doc_ids)
+            self.merged_docs = len(self.doc_ids)
+            return True
+
+    # ---------- reads ----------
+
+    def query(self, text: str, k: int = DOC_INDEX_TOP_K) -> List[Dict]:
+        indices, counts = hash_counts(tokenize(text), self.dim)
+        with self._lock:
+            n = len(self.doc_ids)
+            if not n or not len(indices):
+                return []
+            idf = smooth_idf(self.df[indices], n)
+            # idf once for the query term, once for the document side
+            q = (1.0 + np.log(counts)) * idf * idf
+
+            rows, weights = [], []
+            for f, qf in zip(indices.tolist(), q.tolist()):
+                start, end = int(self.offsets[f]), int(self.offsets[f + 1])
+                if self.max_postings:
+                    end = min(end, start + self.max_postings)
+                if end > start:
+                    rows.append(self.rows[start:end])
+                    weights.append(self.weights[start:end] * qf)
+                pending = self._pending.get(f)
+                if pending:
+                    rows.append(np.asarray(pending[0], dtype=np.int32))
+                    weights.append(np.asarray(pending[1], dtype=np.float32) * qf)
+            if not rows:
+                return []
+
+            scores = np.bincount(np.concatenate(rows), np.concatenate(weights), minlength=n)
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": self.doc_ids[i], "title": self.titles[i], "score": float(scores[i])}
+                for i in top.tolist() if scores[i] > 0
+            ]
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self.doc_ids),
+                "pending": len(self._pending_docs),
+                "postings": len(self.rows),
+                "merging": self._merging,
+            }
+
+
+document_index = DocumentIndex()
+
+
+async def load_document_index(batch: int = 10_000) -> Optional[DocumentIndex]:
+    """
+    Open the memory-mapped index, add every document it does not have yet
+    and merge them in once. Only does anything when DOC_INDEX_ENABLED=1.
+    """
+    if not DOC_INDEX_ENABLED:
+        return None
+    await run_blocking(document_index.load)
+    async with pg_connection() as conn:
+        # ids are not committed in order, so compare the full id sets
+        cur = await conn.execute("SELECT id FROM documents")
+        missing = [row[0] for row in await cur.fetchall() if row[0] not in document_index]
+        for start in range(0, len(missing), batch):
+            cur = await conn.execute(
+                "SELECT id, title, content FROM documents WHERE id = ANY(%s) ORDER BY id",
+                (missing[start:start + batch],),
+            )
+            await run_blocking(document_index.add_many, await cur.fetchall(), False)
+    await run_blocking(document_index.merge)
+    print(f"Document index: {document_index.metrics()}")
+    return document_index
@@ -0,0 +1,136 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+# Fast path answers only when every worker decision is at least this confident
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.8"))
+ROUTER_MEMO_SIZE = int(os.getenv("ROUTER_MEMO_SIZE", "1024"))
+
+GIT_KEYWORDS = {
+    "code", "coding", "repo", "repos", "repository", "repositories", "github",
+    "example", "examples", "demo", "demos", "notebook", "notebooks", "snippet",
+    "snippets", "implementation", "implement", "sdk", "library", "tutorial",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "to", "in", "on", "and", "or", "with", "about",
+    "is", "are", "what", "how", "why", "explain", "describe", "tell", "me", "give",
+    "please", "research", "overview", "introduction", "intro",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def topic_terms(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def normalize_topic(topic: str) -> str:
+    """
+    'What is LangChain?' and 'explain langchain' map to the same key.
+    """
+    return " ".join(sorted(set(topic_terms(topic))))
+
+
+class FastRouter:
+    """
+    Local routing stage run before the orchestrator LLM.
+
+    Combines a memo of past decisions, keyword rules for 'git' and term
+    overlap with the DB titles for 'db'. Returns None when it is not
+    confident enough, in which case the caller asks the LLM and records
+    the answer with remember().
+    """
+
+    def __init__(self, threshold: float = ROUTER_CONFIDENCE_THRESHOLD, memo_size: int = ROUTER_MEMO_SIZE):
+        self.threshold = threshold
+        self.memo_size = memo_size
+        self._memo: OrderedDict[Tuple[str, Tuple[str, ...]], List[str]] = OrderedDict()
+        self.calls = 0
+        self.memo_hits = 0
+        self.rule_hits = 0
+        self.llm_calls = 0
+        self.llm_ms_total = 0.0
+        self.fast_ms_total = 0.0
+
+    def _key(self, topic: str, db_titles: List[str]):
+        return normalize_topic(topic), tuple(db_titles)
+
+    def _db_confidence(self, terms: set, db_titles: List[str]) -> Tuple[bool, float]:
+        if not db_titles or not terms:
+            return False, 0.9
+        best = 0.0
+        for title in db_titles:
+            title_terms = set(topic_terms(title))
+            if title_terms:
+                best = max(best, len(terms & title_terms) / len(terms | title_terms))
+        if best >= 0.6:
+            return True, 0.9
+        if best == 0.0:
+            return False, 0.9
+        return best >= 0.3, 0.5
+
+    def _git_confidence(self, terms: set) -> Tuple[bool, float]:
+        if terms & GIT_KEYWORDS:
+            return True, 0.9
+        return False, 0.6
+
+    def route(self, topic: str, db_titles: List[str]) -> Optional[List[str]]:
+        start = time.perf_counter()
+        self.calls += 1
+
+        key = self._key(topic, db_titles)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            self.fast_ms_total += (time.perf_counter() - start) * 1000
+            return list(self._memo[key])
+
+        terms = set(topic_terms(topic))
+        use_git, git_conf = self._git_confidence(terms)
+        use_db, db_conf = self._db_confidence(terms, db_titles)
+
+        if min(git_conf, db_conf) < self.threshold:
+            return None
+
+        # general facts always come from the web
+        nodes = ["web"]
+        if use_git:
+            nodes.append("git")
+        if use_db:
+            nodes.append("db")
+
+        self.rule_hits += 1
+        self.remember(topic, db_titles, nodes)
+        self.fast_ms_total += (time.perf_counter() - start) * 1000
+        return nodes
+
+    def remember(self, topic: str, db_titles: List[str], nodes: List[str], llm_ms: float = None):
+        if llm_ms is not None:
+            self.llm_calls += 1
+            self.llm_ms_total += llm_ms
+        key = self._key(topic, db_titles)
+        self._memo[key] = list(nodes)
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        hits = self.memo_hits + self.rule_hits
+        llm_ms_avg = self.llm_ms_total / self.llm_calls if self.llm_calls else 0.0
+        fast_ms_avg = self.fast_ms_total / hits if hits else 0.0
+        return {
+            "calls": self.calls,
+            "memo_hits": self.memo_hits,
+            "rule_hits": self.rule_hits,
+            "llm_fallbacks": self.llm_calls,
+            "hit_rate": hits / self.calls if self.calls else 0.0,
+            "llm_ms_avg": llm_ms_avg,
+            # every fast-path answer saves one average orchestrator round-trip
+            "latency_saved_ms": hits * max(llm_ms_avg - fast_ms_avg, 0.0),
+        }
+
+
+fast_router = FastRouter()
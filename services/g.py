@@ -1,14 +1,32 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import requests
 import base64
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 import os
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from services.github_client import github
+from services.summary_cache import SummaryCache, summary_cache, summary_key, git_blob_sha
+from services.code_chunker import chunk_code, chunk_code_spans
 
 load_dotenv()
 
-GITHUB_TOKEN = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")  # optional for higher rate limit
+# parallel blob downloads per repository
+GITHUB_FETCH_WORKERS = int(os.getenv("GITHUB_FETCH_WORKERS", "8"))
+
+# chunk summarization limits, shared by every file and repo in a run
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+SUMMARY_TOKENS_PER_MINUTE = int(os.getenv("SUMMARY_TOKENS_PER_MINUTE", "30000"))
+SUMMARY_MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "3"))
+SUMMARY_MAX_TOKENS = 800
+
+# bump SUMMARY_PROMPT_VERSION whenever SUMMARY_PROMPT changes, cached summaries are keyed by it
+SUMMARY_PROMPT = "Summarize the following Python code:\n\n{chunk}"
+SUMMARY_PROMPT_VERSION = "1"
+SUMMARY_FAILED = "[summary failed:"
 
 # -------------------------
 # LLM MODEL
@@ -17,34 +35,39 @@ web_search_agent_model = ChatGroq(
     api_key=os.getenv("GROQ_API_KEY"),
     model="llama-3.3-70b-versatile",
     temperature=0,
-    max_tokens=800,
+    max_tokens=SUMMARY_MAX_TOKENS,
 )
 
 # -------------------------
 # CHUNKING FUNCTION        
 # -------------------------
-def chunk_text(text: str, chunk_size=1200, overlap=200) -> List[str]:
-    chunks = []
+# Fixed-size character windows. Repo code goes through services.code_chunker
+# instead, which cuts on function/class boundaries; these stay for plain text.
+def chunk_spans(text: str, chunk_size=1200, overlap=200) -> List[Tuple[int, str]]:
+    """
+    Chunks with their character offset in the file.
+    """
+    spans = []
     start = 0
     while start < len(text):
         end = start + chunk_size
-        chunks.append(text[start:end])
+        spans.append((start, text[start:end]))
         start = end - overlap
-    return chunks
+    return spans
+
+
+def chunk_text(text: str, chunk_size=1200, overlap=200) -> List[str]:
+    return [chunk for _, chunk in chunk_spans(text, chunk_size, overlap)]
 
 # -------------------------
 # GITHUB SEARCH
 # -------------------------
 def search_github_repos(topic: str, language="Python", max_results=2) -> List[Dict]:
-    url = "https://api.github.com/search/repositories"
     query = f"{topic} language:{language}"
     params = {"q": query, "sort": "stars", "order": "desc", "per_page": max_results}
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
 
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = github.get("/search/repositories", params=params, timeout=10)
         response.raise_for_status()
     except requests.RequestException as e:
         print("GitHub search error:", e)
@@ -57,13 +80,8 @@ def search_github_repos(topic: str, language="Python", max_results=2) -> List[Di
 # FETCH FILE CONTENT
 # -------------------------
 def fetch_file_content(owner: str, repo: str, path: str, branch="main") -> str:
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={branch}"
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-
     try:
-        r = requests.get(url, headers=headers, timeout=10)
+        r = github.get(f"/repos/{owner}/{repo}/contents/{path}", params={"ref": branch}, timeout=10)
         r.raise_for_status()
     except requests.RequestException:
         return ""
@@ -82,13 +100,8 @@ def fetch_repo_files(owner: str, repo: str, path="", branch="main") -> Dict[str,
     Recursively fetch all Python files in a repository.
     Returns {file_path: file_content}.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={branch}"
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-
     try:
-        r = requests.get(url, headers=headers, timeout=10)
+        r = github.get(f"/repos/{owner}/{repo}/contents/{path}", params={"ref": branch}, timeout=10)
         r.raise_for_status()
     except requests.RequestException:
         return {}
@@ -108,34 +121,211 @@ def fetch_repo_files(owner: str, repo: str, path="", branch="main") -> Dict[str,
                 repo_files[item["path"]] = content
         elif item["type"] == "dir":
             repo_files.update(fetch_repo_files(owner, repo, path=item["path"], branch=branch))
-        time.sleep(0.2)  # avoid GitHub rate limit
     return repo_files
 
+# -------------------------
+# TREE-BASED FETCH REPO FILES
+# -------------------------
+def fetch_repo_tree(owner: str, repo: str, branch="main", extensions=(".py",)) -> List[Dict]:
+    """
+    Whole file list of a branch in one recursive git-trees call.
+    Returns [{"path", "sha", "size"}] for blobs with a matching extension,
+    or None if GitHub truncated the tree.
+    """
+    try:
+        r = github.get(f"/repos/{owner}/{repo}/git/trees/{branch}", params={"recursive": "1"}, timeout=30)
+        r.raise_for_status()
+    except requests.RequestException:
+        return []
+
+    data = r.json()
+    if data.get("truncated"):
+        return None
+
+    return [
+        {"path": item["path"], "sha": item["sha"], "size": item.get("size", 0)}
+        for item in data.get("tree", [])
+        if item["type"] == "blob" and item["path"].endswith(extensions)
+    ]
+
+
+def fetch_blob(owner: str, repo: str, sha: str) -> str:
+    try:
+        r = github.get(f"/repos/{owner}/{repo}/git/blobs/{sha}", timeout=10)
+        r.raise_for_status()
+    except requests.RequestException:
+        return ""
+
+    data = r.json()
+    if data.get("encoding") == "base64":
+        return base64.b64decode(data.get("content", "")).decode("utf-8", errors="replace")
+    return data.get("content", "")
+
+
+def fetch_blobs(
+    owner: str, repo: str, entries: List[Dict], cache: SummaryCache = summary_cache
+) -> Dict[str, str]:
+    """
+    Download the given tree entries concurrently. Returns {file_path: file_content}.
+    Blobs already in the cache are not downloaded again.
+    """
+    cached = cache.get_blobs([e["sha"] for e in entries])
+    missing = [e for e in entries if e["sha"] not in cached]
+
+    with ThreadPoolExecutor(max_workers=GITHUB_FETCH_WORKERS) as pool:
+        contents = list(pool.map(lambda e: fetch_blob(owner, repo, e["sha"]), missing))
+
+    for e, content in zip(missing, contents):
+        if content:
+            cache.put_blob(e["sha"], content)
+            cached[e["sha"]] = content
+
+    return {e["path"]: cached[e["sha"]] for e in entries if cached.get(e["sha"])}
+
+
+def fetch_repo_files_tree(
+    owner: str, repo: str, branch="main", cache: SummaryCache = summary_cache
+) -> Dict[str, str]:
+    """
+    Same result as fetch_repo_files in 1 + (number of .py files) requests,
+    with the downloads running in parallel.
+    """
+    entries = fetch_repo_tree(owner, repo, branch)
+    if entries is None:
+        # tree too large for one call, walk it directory by directory instead
+        return fetch_repo_files(owner, repo, branch=branch)
+    return fetch_blobs(owner, repo, entries, cache)
+
 # -------------------------
 # FETCH AND CHUNK REPO CODE
 # -------------------------
 def fetch_repo_code(owner: str, repo: str, branch: str) -> Dict[str, List[str]]:
-    repo_files = fetch_repo_files(owner, repo, branch)
+    repo_files = fetch_repo_files_tree(owner, repo, branch)
     repo_code = {}
     for fpath, content in repo_files.items():
-        repo_code[fpath] = chunk_text(content)
+        repo_code[fpath] = chunk_code(content, fpath)
     return repo_code
 
 # -------------------------
-# SUMMARIZE CODE CHUNKS
+# BATCHED CHUNK SUMMARIZATION
 # -------------------------
-def summarize_code_chunks(chunks: List[str]) -> str:
-    summaries = []
+class TokenRateLimiter:
+    """
+    Token bucket refilled continuously at tokens_per_minute.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, n: int):
+        n = min(n, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
+
+
+class SummaryProgress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.retries = 0
+        self.failed = 0
+        self._last_step = -1
+        self._last_done = -1
+
+    def report(self, force=False):
+        step = max(self.total // 20, 1)  # roughly every 5%
+        if self.done == self._last_done:
+            return
+        if force or self.done // step != self._last_step:
+            self._last_step = self.done // step
+            self._last_done = self.done
+            print(f"Summarized {self.done}/{self.total} chunks ({self.retries} retries, {self.failed} failed)")
+
+
+async def summarize_chunks_async(chunks: List[str], progress: SummaryProgress = None) -> List[str]:
+    """
+    Summarize every chunk concurrently, at most SUMMARY_CONCURRENCY calls in
+    flight and SUMMARY_TOKENS_PER_MINUTE tokens per minute across all of them.
+    A failing chunk is retried with backoff up to SUMMARY_MAX_RETRIES times.
+    Summaries come back in the order of the input chunks.
+    """
+    progress = progress or SummaryProgress(len(chunks))
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    limiter = TokenRateLimiter(SUMMARY_TOKENS_PER_MINUTE)
 
-    for i, chunk in enumerate(chunks, 1):
-        response = web_search_agent_model.invoke(
-            input=f"Summarize the following Python code:\n\n{chunk}"
-        )
-        summaries.append(response.content)
-        print(f"Processed chunk {i}/{len(chunks)}")
-        time.sleep(0.5)
+    async def summarize(chunk: str) -> str:
+        prompt = SUMMARY_PROMPT.format(chunk=chunk)
+        # prompt plus the reply budget, 1 token ~ 4 characters
+        await limiter.acquire(len(prompt) // 4 + SUMMARY_MAX_TOKENS)
+        async with semaphore:
+            for attempt in range(SUMMARY_MAX_RETRIES + 1):
+                try:
+                    response = await web_search_agent_model.ainvoke(input=prompt)
+                    progress.done += 1
+                    progress.report()
+                    return response.content
+                except Exception as e:
+                    if attempt == SUMMARY_MAX_RETRIES:
+                        progress.done += 1
+                        progress.failed += 1
+                        progress.report()
+                        return f"{SUMMARY_FAILED} {e}]"
+                    progress.retries += 1
+                    await asyncio.sleep(2 ** attempt)
 
-    return "\n".join(summaries)
+    return await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+
+
+async def summarize_repos_async(repo_files: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    One batch over every chunk of every file of every repo.
+
+    Each chunk summary is cached under blob sha + chunk offset + model +
+    prompt version, so only chunks of new or changed files reach the model.
+    Returns a {file_path: summary} dict per repo, in input order.
+    """
+    model = web_search_agent_model.model_name
+    jobs = [
+        (r, fpath, summary_key(git_blob_sha(content), offset, len(chunk), model, SUMMARY_PROMPT_VERSION), chunk)
+        for r, files in enumerate(repo_files)
+        for fpath, content in files.items()
+        for offset, chunk in chunk_code_spans(content, fpath)
+    ]
+
+    cached = summary_cache.get_summaries([key for _, _, key, _ in jobs])
+    todo = [(key, chunk) for _, _, key, chunk in jobs if key not in cached]
+    print(f"{len(jobs) - len(todo)}/{len(jobs)} chunk summaries reused from cache")
+
+    progress = SummaryProgress(len(todo))
+    fresh = await summarize_chunks_async([chunk for _, chunk in todo], progress)
+    progress.report(force=True)
+
+    for (key, _), summary in zip(todo, fresh):
+        if not summary.startswith(SUMMARY_FAILED):
+            summary_cache.put_summary(key, summary)
+        cached[key] = summary
+
+    repo_summaries: List[Dict[str, List[str]]] = [{} for _ in repo_files]
+    for r, fpath, key, _ in jobs:
+        repo_summaries[r].setdefault(fpath, []).append(cached[key])
+    return [{fpath: "\n".join(parts) for fpath, parts in rs.items()} for rs in repo_summaries]
+
+# -------------------------
+# SUMMARIZE CODE CHUNKS
+# -------------------------
+def summarize_code_chunks(chunks: List[str]) -> str:
+    return "\n".join(asyncio.run(summarize_chunks_async(chunks)))
 
 # -------------------------
 # MAIN PIPELINE
@@ -145,23 +335,24 @@ if __name__ == "__main__":
     print(f"Searching GitHub for topic: {topic} ...")
     repos = search_github_repos(topic, max_results=2)
 
-    final_results = []
-
     for repo_info in repos:
-        owner = repo_info["owner"]
-        repo = repo_info["repo"]
-        branch = repo_info["default_branch"]
-        print(f"\nFetching code for repo: {owner}/{repo} (branch: {branch})")
+        print(f"\nFetching code for repo: {repo_info['owner']}/{repo_info['repo']} (branch: {repo_info['default_branch']})")
 
-        repo_code = fetch_repo_code(owner, repo, branch)
+    # repos are fetched side by side, then all their chunks are summarized in one batch
+    with ThreadPoolExecutor(max_workers=max(len(repos), 1)) as pool:
+        repo_files = list(pool.map(
+            lambda r: fetch_repo_files_tree(r["owner"], r["repo"], r["default_branch"]), repos
+        ))
 
-        repo_summary = {}
-        for fpath, chunks in repo_code.items():
-            summary = summarize_code_chunks(chunks)
-            repo_summary[fpath] = summary
+    repo_codes = [{fpath: chunk_code(content, fpath) for fpath, content in files.items()} for files in repo_files]
+    repo_summaries = asyncio.run(summarize_repos_async(repo_files))
+    print(f"Summary cache: {summary_cache.metrics()}")
+
+    final_results = []
 
+    for repo_info, repo_code, repo_summary in zip(repos, repo_codes, repo_summaries):
         final_results.append({
-            "repo": f"{owner}/{repo}",
+            "repo": f"{repo_info['owner']}/{repo_info['repo']}",
             "code": repo_code,      # full chunked code for UI
             "summary": repo_summary # summaries per file for UI
         })
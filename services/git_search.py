@@ -1,9 +1,12 @@
 import os
-import requests
 from dotenv import load_dotenv
 
 from services.make_pretty_output import pretty
 from services.web_search_agent_demo import web_search_agent_model
+from services.blocking import to_async
+from services.tool_cache import cached_tool
+from services.github_client import github
+from services.mco.client_pool import mcp_pool
 
 from langchain_groq import ChatGroq
 from langchain.agents import create_agent
@@ -17,18 +20,16 @@ load_dotenv()
 langfuse_handler = CallbackHandler()
 
 
+@cached_tool("search_github_repositories")
 def search_github_repositories(query: str):
     """
     Search for GitHub repositories related to a specific research topic.
     Returns a list of repositories with their descriptions and star counts.
     """
-    url = f"https://api.github.com/search/repositories?q={query}&sort=stars&order=desc"
-    headers = {
-        "Authorization": f"token {os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
-    response = requests.get(url, headers=headers)
+    response = github.get(
+        "/search/repositories",
+        params={"q": query, "sort": "stars", "order": "desc"},
+    )
     if response.status_code != 200:
         return f"Error: {response.status_code} - {response.text}"
 
@@ -48,20 +49,15 @@ def search_github_repositories(query: str):
 
 
 
+@cached_tool("search_github_files")
 def search_github_files(research_topic: str):
     """
     Finds code demos and Jupyter Notebooks for a research topic.
     Returns file paths and direct links to code examples.
     """
     query = f"{research_topic} extension:ipynb extension:ipynb path:examples path:demo path:notebooks"
-    url = f"https://api.github.com/search/code?q={query}"
-
-    headers = {
-        "Authorization": f"token {os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")}",
-        "Accept": "application/vnd.github.v3+json"
-    }
 
-    response = requests.get(url, headers=headers)
+    response = github.get("/search/code", params={"q": query})
     if response.status_code != 200:
         return f"Error: {response.status_code} - {response.text}"
 
@@ -86,7 +82,7 @@ def fetch_code(url: str):
 
     # url = "https://raw.githubusercontent.com/langchain-ai/langchain/master/libs/langchain/langchain/chains/base.py"
 
-    resp = requests.get(url)
+    resp = github.get(url)
 
 
     nb = resp.json() 
@@ -117,39 +113,69 @@ def code_generation(query: str):
     return response.content
 
 
+async def acode_generation(query: str):
+
+    response = await llm.ainvoke([
+        HumanMessage(content=query)
+    ])
+    print(response.content)
+    return response.content
+
+
 # code_generation("Write a C++ code for dijkstra algorithm")
 
 
+async def remote_code_search(query: str):
+    """
+    Grep the top GitHub repositories for a topic through the remote grep
+    MCP server. Returns matching code lines with repository, path and line.
+    """
+    try:
+        return await mcp_pool.call_tool("remote_grep", {"query": query, "max_results": 20})
+    except Exception as e:
+        return f"Error: remote grep failed - {e}"
+
+
 
 
 search_github_repo_tool = Tool(
     name="search_github_repo_tool",
     func=search_github_repositories,
+    coroutine=to_async(search_github_repositories),
     description="Search GitHub for Python repositories related to a content"
 )
 
 search_github_files_tool = Tool(
     name="search_github_files_tool",
     func=search_github_files,
+    coroutine=to_async(search_github_files),
     description="Search GitHub for Python files or notebooks related to a content"
 )
 
 code_generation_tool = Tool(
     name="code_generation_tool",
     func=code_generation,
+    coroutine=acode_generation,
     description="generate code based on the user queries"
 )
 
+remote_code_search_tool = Tool(
+    name="remote_code_search_tool",
+    func=None,
+    coroutine=remote_code_search,
+    description="Search inside the code of top GitHub repositories for an identifier or phrase and return matching lines"
+)
+
 
 
 github_agent = create_agent(
     model=web_search_agent_model,
-    tools=[search_github_repo_tool, search_github_files_tool, code_generation_tool],
+    tools=[search_github_repo_tool, search_github_files_tool, remote_code_search_tool, code_generation_tool],
     system_prompt="""
 You are a professional github research agent.
 
 Your goal:
-- Use the search_github_repo_tool, search_github_files_tool and code_generation_tool tool to gather accurate, up-to-date information
+- Use the search_github_repo_tool, search_github_files_tool, remote_code_search_tool and code_generation_tool tool to gather accurate, up-to-date information
 - If needed, call the tool multiple times but atmax 5 times
 - Verify information consistency
 - Remove noise, ads, and irrelevant content
@@ -0,0 +1,176 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_TOKEN = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")  # optional for higher rate limit
+
+# keep-alive connections kept per host
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "16"))
+# ETag'd responses remembered for conditional requests
+GITHUB_ETAG_CACHE_SIZE = int(os.getenv("GITHUB_ETAG_CACHE_SIZE", "512"))
+# below this many remaining calls, requests are spread evenly until the window resets
+GITHUB_PACE_BELOW = int(os.getenv("GITHUB_PACE_BELOW", "10"))
+# never sleep longer than this for quota; the request is sent and GitHub decides
+GITHUB_MAX_RATE_WAIT = float(os.getenv("GITHUB_MAX_RATE_WAIT", "60"))
+
+
+def _resource_for(url: str) -> str:
+    if "/search/code" in url:
+        return "code_search"
+    if "/search/" in url:
+        return "search"
+    return "core"
+
+
+class GitHubClient:
+    """
+    One pooled session for every GitHub call in the app.
+
+    - keep-alive connection pool shared by all helpers and threads
+    - ETag / If-None-Match on API GETs; a 304 returns the remembered
+      response and does not count against the rate limit
+    - X-RateLimit-Remaining / X-RateLimit-Reset tracked per resource
+      (core, search, code_search) to pace requests instead of failing
+    """
+
+    def __init__(self, base_url: str = GITHUB_API_URL, token: Optional[str] = GITHUB_TOKEN):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=GITHUB_POOL_SIZE,
+            # after the last retry the 5xx response is returned, not raised,
+            # so callers keep their status_code checks
+            max_retries=Retry(
+                total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        # url + request headers -> (etag, response)
+        self._etags: OrderedDict[str, Tuple[str, requests.Response]] = OrderedDict()
+        # resource -> (remaining, reset epoch seconds)
+        self._limits: Dict[str, Tuple[int, float]] = {}
+
+        self.requests_sent = 0
+        self.not_modified = 0
+        self.rate_waits = 0
+
+    def _is_api(self, url: str) -> bool:
+        return url.startswith(self.base_url)
+
+    def _wait_for_quota(self, resource: str):
+        with self._lock:
+            remaining, reset = self._limits.get(resource, (None, 0.0))
+            now = time.time()
+            if remaining is None or now >= reset:
+                return
+            if remaining <= 0:
+                delay = reset - now
+            elif remaining < GITHUB_PACE_BELOW:
+                delay = (reset - now) / remaining
+            else:
+                delay = 0.0
+            # reserve our call so concurrent threads pace against the same budget
+            self._limits[resource] = (remaining - 1, reset)
+
+        if delay > 0:
+            self.rate_waits += 1
+            time.sleep(min(delay, GITHUB_MAX_RATE_WAIT))
+
+    def _record_limits(self, resource: str, response: requests.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        resource = response.headers.get("X-RateLimit-Resource", resource)
+        with self._lock:
+            self._limits[resource] = (int(remaining), float(reset))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None, timeout: float = 10) -> requests.Response:
+        """
+        GET an API path ("/search/repositories") or any absolute URL.
+        Auth, conditional requests and pacing only apply to API URLs.
+        """
+        if not url.startswith("http"):
+            url = self.base_url + url
+
+        request_headers = dict(headers or {})
+        if not self._is_api(url):
+            self.requests_sent += 1
+            return self.session.get(url, params=params, headers=request_headers, timeout=timeout)
+
+        request_headers.setdefault("Accept", "application/vnd.github.v3+json")
+        if self.token:
+            request_headers["Authorization"] = f"token {self.token}"
+
+        # headers like Accept change the representation, so they are part of the key
+        key = requests.Request("GET", url, params=params).prepare().url + "\n" + "\n".join(sorted(
+            f"{name.lower()}: {value}" for name, value in request_headers.items()
+            if name.lower() != "authorization"
+        ))
+        with self._lock:
+            cached = self._etags.get(key)
+        if cached:
+            request_headers["If-None-Match"] = cached[0]
+
+        resource = _resource_for(url)
+        self._wait_for_quota(resource)
+
+        response = self.session.get(url, params=params, headers=request_headers, timeout=timeout)
+        self.requests_sent += 1
+        self._record_limits(resource, response)
+
+        # secondary rate limit: GitHub says how long to back off
+        retry_after = response.headers.get("Retry-After")
+        if response.status_code in (403, 429) and retry_after:
+            self.rate_waits += 1
+            time.sleep(min(float(retry_after), GITHUB_MAX_RATE_WAIT))
+            response = self.session.get(url, params=params, headers=request_headers, timeout=timeout)
+            self.requests_sent += 1
+            self._record_limits(resource, response)
+
+        if response.status_code == 304 and cached:
+            self.not_modified += 1
+            with self._lock:
+                self._etags.move_to_end(key)
+            return cached[1]
+
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and etag:
+            response.content  # read the body now so the response can be served again
+            with self._lock:
+                self._etags[key] = (etag, response)
+                self._etags.move_to_end(key)
+                while len(self._etags) > GITHUB_ETAG_CACHE_SIZE:
+                    self._etags.popitem(last=False)
+
+        return response
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            limits = {r: {"remaining": rem, "reset": reset} for r, (rem, reset) in self._limits.items()}
+        return {
+            "requests_sent": self.requests_sent,
+            "not_modified": self.not_modified,
+            "rate_waits": self.rate_waits,
+            "limits": limits,
+        }
+
+
+github = GitHubClient()
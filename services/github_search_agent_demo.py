@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
@@ -6,6 +5,7 @@ from langchain_core.tools import tool
 from langchain.agents import create_agent
 from dotenv import load_dotenv
 from services.tavily_search import tavily_client
+from services.github_client import github
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from langchain_core.tools import Tool
 import os
@@ -36,11 +36,11 @@ def search_github(topic, language="Python", max_results=2):
     Returns:
         list: A list of dictionaries with repo info (name, url, description).
     """
-    url = "https://api.github.com/search/repositories"
+    url = "/search/repositories"
     query = f"{topic} language:{language}"
     params = {"q": query, "sort": "stars", "order": "desc", "per_page": max_results}
     
-    response = requests.get(url, params=params)
+    response = github.get(url, params=params)
     if response.status_code != 200:
         print(f"Error: {response.status_code} - {response.json().get('message')}")
         return []
@@ -74,7 +74,7 @@ def search_github(topic, language="Python", max_results=2):
     }
     for url in urls:
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = github.get(url, headers=headers, timeout=10)
             response.raise_for_status()
 
             soup = BeautifulSoup(response.text, "html.parser")
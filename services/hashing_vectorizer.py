@@ -0,0 +1,47 @@
+import re
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def hash_token(token: str, dim: int) -> int:
+    # crc32 rather than hash(): stable across processes, so vectors can be persisted
+    return zlib.crc32(token.encode("utf-8")) % dim
+
+
+def hash_counts(tokens: List[str], dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse term counts of the hashed tokens as (indices, counts).
+    """
+    if not tokens:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    idx = np.fromiter((hash_token(t, dim) for t in tokens), dtype=np.int64, count=len(tokens))
+    indices, counts = np.unique(idx, return_counts=True)
+    return indices, counts.astype(np.float32)
+
+
+def tf_vector(tokens: List[str], dim: int) -> np.ndarray:
+    """
+    Dense log-scaled term frequency vector (float32) of the hashed tokens.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    indices, counts = hash_counts(tokens, dim)
+    vec[indices] = 1.0 + np.log(counts)
+    return vec
+
+
+def smooth_idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    return (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
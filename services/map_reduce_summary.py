@@ -0,0 +1,103 @@
+import os
+import re
+from typing import List, Tuple
+
+from langgraph.constants import TAG_NOSTREAM
+
+from services.text_splitter import split_text_into_chunks
+
+# Token budget the final summary prompt must fit in (1 token ~ 4 characters)
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "6000"))
+# Size of each map chunk and how many chunks are summarized at the same time
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "2500"))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+SUMMARY_MAX_ROUNDS = int(os.getenv("SUMMARY_MAX_ROUNDS", "4"))
+
+_CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+_PLACEHOLDER = "[[CODE_BLOCK_{}]]"
+_PLACEHOLDER_RE = re.compile(r"\[\[CODE_BLOCK_(\d+)\]\]")
+
+MAP_PROMPT = (
+    "Condense the following research notes. Keep every fact, name, number and link "
+    "that matters, drop repetition. Copy any [[CODE_BLOCK_n]] marker exactly as it "
+    "appears, on its own line:\n\n{chunk}"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def extract_code_blocks(text: str) -> Tuple[str, List[str]]:
+    """
+    Swap fenced code blocks for short markers so the map step never rewrites them.
+    """
+    blocks = []
+
+    def keep(match):
+        blocks.append(match.group(0))
+        return _PLACEHOLDER.format(len(blocks) - 1)
+
+    return _CODE_BLOCK_RE.sub(keep, text), blocks
+
+
+def restore_code_blocks(text: str, blocks: List[str]) -> str:
+    seen = set()
+
+    def put_back(match):
+        i = int(match.group(1))
+        if i >= len(blocks):
+            return match.group(0)
+        seen.add(i)
+        return blocks[i]
+
+    text = _PLACEHOLDER_RE.sub(put_back, text)
+
+    # a marker the model dropped must not cost us the code itself
+    missing = [blocks[i] for i in range(len(blocks)) if i not in seen]
+    if missing:
+        text += "\n\nCode demos:\n\n" + "\n\n".join(missing)
+    return text
+
+
+async def reduce_research(research_content: List[str], model, token_budget: int = SUMMARY_TOKEN_BUDGET) -> str:
+    """
+    Shrink the combined worker output until it fits the token budget.
+
+    Oversized input is split with split_text_into_chunks, the chunks are
+    condensed concurrently (at most SUMMARY_MAP_CONCURRENCY at once), and
+    the joined result is reduced again until it fits or SUMMARY_MAX_ROUNDS
+    is reached. Fenced code blocks are carried through verbatim. Input that
+    already fits is returned unchanged without any LLM call.
+    """
+    combined = "\n\n".join(research_content)
+    if estimate_tokens(combined) <= token_budget:
+        return combined
+
+    text, blocks = extract_code_blocks(combined)
+    code_tokens = sum(estimate_tokens(b) for b in blocks)
+    # code stays verbatim, so only the prose has to fit in what is left
+    prose_budget = max(token_budget - code_tokens, SUMMARY_CHUNK_TOKENS)
+
+    rounds = 0
+    while estimate_tokens(text) > prose_budget and rounds < SUMMARY_MAX_ROUNDS:
+        rounds += 1
+        chunks = split_text_into_chunks(
+            [text],
+            chunk_size=SUMMARY_CHUNK_TOKENS * 4,
+            chunk_overlap=0,
+        )
+        print(f"Map-reduce round {rounds}: condensing {len(chunks)} chunks")
+
+        responses = await model.abatch(
+            [MAP_PROMPT.format(chunk=chunk) for chunk in chunks],
+            config={"max_concurrency": SUMMARY_MAP_CONCURRENCY, "tags": [TAG_NOSTREAM]},
+        )
+        reduced = "\n\n".join(r.content for r in responses)
+
+        # the model made no progress, more rounds would not help
+        if estimate_tokens(reduced) >= estimate_tokens(text):
+            break
+        text = reduced
+
+    return restore_code_blocks(text, blocks)
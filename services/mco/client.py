@@ -1,6 +1,33 @@
+import json
 import asyncio
+from typing import Any, AsyncIterator, Dict, List
 from fastmcp import Client
 
+
+async def stream_remote_grep(client: Client, arguments: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Call remote_grep and yield its snippet batches as the server reports
+    them, instead of waiting for every repo to be cloned and searched.
+    """
+    batches: asyncio.Queue = asyncio.Queue()
+
+    async def on_progress(progress: float, total: float, message: str):
+        # remote_grep sends each batch as JSON in the progress message
+        if message:
+            batches.put_nowait(json.loads(message))
+
+    call = asyncio.create_task(
+        client.call_tool("remote_grep", arguments, progress_handler=on_progress)
+    )
+    call.add_done_callback(lambda _: batches.put_nowait(None))
+    try:
+        while (batch := await batches.get()) is not None:
+            yield batch
+        await call  # surface tool errors
+    finally:
+        call.cancel()
+
+
 async def main():
     # Replace this with your server URL or transport
     # If your MCP server runs HTTP on localhost:9000 with path /mcp:
@@ -17,9 +44,10 @@ async def main():
         tools = await client.list_tools()
         print("Available tools:", tools)
 
-        # Call a tool named "greet" with an argument
-        result = await client.call_tool("remote_grep", {"query": "Tool calling code demo"})
-        print("Result:", result)
+        # Snippets are printed as soon as each repo reports them
+        async for batch in stream_remote_grep(client, {"query": "Tool calling code demo"}):
+            for snippet in batch:
+                print(f"{snippet['repository']} {snippet['path']}:{snippet['line']}  {snippet['code']}")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,170 @@
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import anyio
+import httpx
+from dotenv import load_dotenv
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+load_dotenv()
+
+# Long-lived MCP client sessions shared by every agent tool call.
+#
+# MCP_SERVER_URL       the remote grep server (services/mco/mcp_server.py)
+# MCP_POOL_SIZE        warm sessions kept open; calls are spread over them
+# MCP_TOOLS_TTL        seconds the list_tools metadata is reused
+# MCP_CALL_TIMEOUT     per call, in seconds
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:9000/mcp")
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", "300"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "120"))
+
+# failures of the connection itself; worth a fresh session and one retry
+TRANSPORT_ERRORS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+
+
+def is_transport_error(e: Exception, client: Client) -> bool:
+    # a timeout is the server being slow, not the session being broken
+    if isinstance(e, httpx.TimeoutException):
+        return False
+    return isinstance(e, TRANSPORT_ERRORS) or not client.is_connected()
+
+
+class MCPClientPool:
+    """
+    A few connected fastmcp sessions, opened on first use and kept warm.
+
+    - call_tool goes to the session with the fewest calls in flight, so
+      concurrent calls are multiplexed instead of queued behind each other
+    - list_tools is fetched once per MCP_TOOLS_TTL and used to reject
+      unknown tool names without a round trip
+    - a session that fails at the transport level is dropped, reopened and
+      the call retried once; tool errors, MCP error responses and timeouts
+      are passed through untouched
+    """
+
+    def __init__(self, url: str = MCP_SERVER_URL, size: int = MCP_POOL_SIZE):
+        self.url = url
+        self.size = size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._clients: List[Client] = []
+        self._in_flight: Dict[Client, int] = {}
+        self._tools: Optional[Dict[str, Any]] = None
+        self._tools_at = 0.0
+
+        self.calls = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.call_ms_total = 0.0
+
+    def _bind_loop(self):
+        # sessions belong to the loop that opened them; a new loop starts a new pool
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._clients = []
+            self._in_flight = {}
+
+    async def _open(self) -> Client:
+        client = Client(self.url, timeout=MCP_CALL_TIMEOUT)
+        await client.__aenter__()
+        self.connects += 1
+        return client
+
+    async def _close(self, client: Client):
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+    async def _pick(self) -> Client:
+        self._bind_loop()
+        async with self._lock:
+            self._clients = [c for c in self._clients if c.is_connected()]
+            idle = [c for c in self._clients if not self._in_flight.get(c)]
+            if not idle and len(self._clients) < self.size:
+                client = await self._open()
+                self._clients.append(client)
+                return client
+            return min(self._clients, key=lambda c: self._in_flight.get(c, 0))
+
+    async def _drop(self, client: Client):
+        async with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        self._in_flight.pop(client, None)
+        await self._close(client)
+
+    async def list_tools(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Tool name -> MCP tool metadata, cached.
+        """
+        if refresh or self._tools is None or time.time() - self._tools_at > MCP_TOOLS_TTL:
+            tools = await self._with_client(lambda client: client.list_tools())
+            self._tools = {tool.name: tool for tool in tools}
+            self._tools_at = time.time()
+        return self._tools
+
+    async def _with_client(self, request):
+        for attempt in range(2):
+            client = await self._pick()
+            self._in_flight[client] = self._in_flight.get(client, 0) + 1
+            try:
+                return await request(client)
+            except ToolError:
+                raise
+            except Exception as e:
+                if not is_transport_error(e, client):
+                    raise
+                await self._drop(client)
+                if attempt:
+                    raise
+                self.reconnects += 1
+            finally:
+                if client in self._in_flight:
+                    self._in_flight[client] -= 1
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any], progress_handler=None) -> Any:
+        tools = await self.list_tools()
+        if name not in tools:
+            tools = await self.list_tools(refresh=True)
+            if name not in tools:
+                raise ToolError(f"MCP server at {self.url} has no tool {name!r}")
+
+        start = time.perf_counter()
+        result = await self._with_client(
+            lambda client: client.call_tool(name, arguments, progress_handler=progress_handler)
+        )
+        self.calls += 1
+        self.call_ms_total += (time.perf_counter() - start) * 1000
+        return result.data if result.data is not None else result.content
+
+    async def close(self):
+        if self._loop is not asyncio.get_running_loop():
+            return
+        clients, self._clients = self._clients, []
+        for client in clients:
+            await self._close(client)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._clients),
+            "calls": self.calls,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "avg_call_ms": self.call_ms_total / self.calls if self.calls else 0.0,
+        }
+
+
+mcp_pool = MCPClientPool()
@@ -1,28 +1,72 @@
 import os
+import json
+import time
+import shutil
+import asyncio
+import threading
 import subprocess
-import requests
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
-GITHUB_API = "https://api.github.com/search/repositories"
-CACHE_DIR = "repo_cache"
+from services.github_client import github
+from services.blocking import run_blocking
+from services.mco.trigram_index import drop_index
+
+# Checkouts searched by remote_grep.
+#
+# REPO_CACHE_DIR         where checkouts live, one directory per owner/repo
+# REPO_CACHE_TTL         seconds before a checkout is refreshed with a shallow fetch
+# REPO_CACHE_MAX_BYTES   disk budget; least recently used checkouts are evicted past it
+CACHE_DIR = os.getenv("REPO_CACHE_DIR", "repo_cache")
+REPO_CACHE_TTL = float(os.getenv("REPO_CACHE_TTL", str(24 * 3600)))
+REPO_CACHE_MAX_BYTES = int(os.getenv("REPO_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
 
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# sparse-checkout patterns per search language; anything else gets a full checkout
+LANGUAGE_PATTERNS = {
+    "python": ["*.py", "*.pyi"],
+    "javascript": ["*.js", "*.jsx", "*.mjs", "*.cjs"],
+    "typescript": ["*.ts", "*.tsx"],
+    "go": ["*.go"],
+    "rust": ["*.rs"],
+    "java": ["*.java"],
+    "kotlin": ["*.kt", "*.kts"],
+    "c": ["*.c", "*.h"],
+    "c++": ["*.cc", "*.cpp", "*.cxx", "*.h", "*.hh", "*.hpp"],
+    "c#": ["*.cs"],
+    "ruby": ["*.rb"],
+    "php": ["*.php"],
+    "swift": ["*.swift"],
+    "scala": ["*.scala"],
+}
+# always checked out next to the language files
+COMMON_PATTERNS = ["README*", "readme*"]
+
 
 def search_github_repos(query: str, language: str, max_repos: int) -> List[str]:
     q = f"{query} language:{language}"
     params = {"q": q, "sort": "stars", "order": "desc", "per_page": max_repos}
 
-    res = requests.get(GITHUB_API, params=params)
+    res = github.get("/search/repositories", params=params)
     res.raise_for_status()
 
     items = res.json()["items"]
     return [repo["clone_url"] for repo in items]
 
 
+def repo_path_for(clone_url: str) -> str:
+    # owner__repo, so same-named repos of different owners do not collide
+    owner, repo = clone_url.rstrip("/").split("/")[-2:]
+    return os.path.join(CACHE_DIR, f"{owner}__{repo.replace('.git', '')}")
+
+
+def language_patterns(language: str) -> Optional[List[str]]:
+    patterns = LANGUAGE_PATTERNS.get(language.lower())
+    return patterns + COMMON_PATTERNS if patterns else None
+
+
 def clone_repo(clone_url: str) -> str:
-    repo_name = clone_url.split("/")[-1].replace(".git", "")
-    repo_path = os.path.join(CACHE_DIR, repo_name)
+    repo_path = repo_path_for(clone_url)
 
     if not os.path.exists(repo_path):
         subprocess.run(
@@ -31,3 +75,214 @@ def clone_repo(clone_url: str) -> str:
         )
 
     return repo_path
+
+
+async def run_process(*cmd: str) -> Tuple[int, bytes]:
+    """
+    Run a command without blocking the event loop. The process is killed
+    if the awaiting task is cancelled.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        stdout, _ = await proc.communicate()
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    return proc.returncode, stdout
+
+
+async def git(*args: str) -> bytes:
+    code, stdout = await run_process("git", *args)
+    if code != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed with exit code {code}")
+    return stdout
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class RepoCache:
+    """
+    Checkouts in CACHE_DIR, kept fresh and within a disk budget.
+
+    - blobless (--filter=blob:none), depth 1 clones with a sparse checkout
+      of the requested language's files; a later request for another
+      language widens the sparse set
+    - entries older than the TTL are refreshed with a shallow fetch + reset
+    - least recently used checkouts are deleted (with their trigram index)
+      while the cache is over budget; checkouts in use are never evicted
+    - one lock per checkout, so concurrent requests clone or refresh it once
+
+    Bookkeeping lives in CACHE_DIR/.cache.json.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, ttl: float = REPO_CACHE_TTL, max_bytes: int = REPO_CACHE_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.meta_path = os.path.join(root, ".cache.json")
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pins: Dict[str, int] = {}
+        # one eviction pass at a time, or two passes count the same entry's size twice
+        self._evict_lock = asyncio.Lock()
+        self._save_lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load()
+        self.clones = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.meta_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".partial"):
+                shutil.rmtree(path, ignore_errors=True)
+            elif not name.startswith(".") and name not in entries and os.path.isdir(path):
+                # checkouts from before the manager: refreshed on next use, evicted first
+                entries[name] = {"fetched_at": 0, "used_at": 0, "size": None, "patterns": None}
+        return {name: e for name, e in entries.items() if os.path.isdir(os.path.join(self.root, name))}
+
+    def _save(self):
+        with self._save_lock:
+            tmp = self.meta_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.meta_path)
+
+    async def _clone(self, clone_url: str, repo_path: str, patterns: Optional[List[str]]):
+        # clone into a scratch directory and rename into place when complete,
+        # so a cancelled or failed clone never leaves a half-checked-out repo
+        partial = repo_path + ".partial"
+        await run_blocking(shutil.rmtree, partial, True)
+        try:
+            if patterns:
+                await git("clone", "--filter=blob:none", "--depth", "1", "--sparse", clone_url, partial)
+                await git("-C", partial, "sparse-checkout", "set", "--no-cone", *patterns)
+            else:
+                await git("clone", "--filter=blob:none", "--depth", "1", clone_url, partial)
+            os.rename(partial, repo_path)
+        finally:
+            await run_blocking(shutil.rmtree, partial, True)
+        self.clones += 1
+
+    async def _refresh(self, repo_path: str):
+        await git("-C", repo_path, "fetch", "--depth", "1", "--filter=blob:none", "origin", "HEAD")
+        await git("-C", repo_path, "reset", "--hard", "FETCH_HEAD")
+        self.refreshes += 1
+
+    async def _widen(self, repo_path: str, entry: Dict, patterns: Optional[List[str]]):
+        if entry["patterns"] is None:
+            return
+        if patterns is None:
+            await git("-C", repo_path, "sparse-checkout", "disable")
+            entry["patterns"] = None
+            return
+        missing = [p for p in patterns if p not in entry["patterns"]]
+        if missing:
+            await git("-C", repo_path, "sparse-checkout", "add", *missing)
+            entry["patterns"] = entry["patterns"] + missing
+
+    async def acquire(self, clone_url: str, language: str = "") -> str:
+        """
+        Path of an up-to-date checkout containing the language's files.
+        Pinned against eviction until release().
+        """
+        repo_path = repo_path_for(clone_url)
+        name = os.path.basename(repo_path)
+        patterns = language_patterns(language)
+        lock = self._locks.setdefault(name, asyncio.Lock())
+
+        async with lock:
+            entry = self.entries.get(name)
+            changed = False
+            if entry is None or not os.path.isdir(repo_path):
+                await self._clone(clone_url, repo_path, patterns)
+                entry = {"fetched_at": time.time(), "patterns": patterns}
+                changed = True
+            else:
+                if time.time() - entry["fetched_at"] > self.ttl:
+                    try:
+                        await self._refresh(repo_path)
+                        entry["fetched_at"] = time.time()
+                        changed = True
+                    except RuntimeError as e:
+                        # e.g. no network: the old checkout is still worth searching,
+                        # the refresh is tried again on the next request
+                        print(f"repo cache: refresh of {name} failed, serving the stale checkout: {e}")
+                before = entry["patterns"]
+                await self._widen(repo_path, entry, patterns)
+                changed = changed or entry["patterns"] != before or entry.get("size") is None
+
+            if changed:
+                entry["size"] = await run_blocking(dir_size, repo_path)
+            entry["used_at"] = time.time()
+            self.entries[name] = entry
+            await run_blocking(self._save)
+            self._pins[name] = self._pins.get(name, 0) + 1
+
+        # the caller only releases a path it got back, so a cancelled or
+        # failed eviction must undo the pin itself
+        try:
+            await self.evict()
+        except BaseException:
+            self.release(repo_path)
+            raise
+        return repo_path
+
+    def release(self, repo_path: str):
+        name = os.path.basename(repo_path)
+        if self._pins.get(name, 0) <= 1:
+            self._pins.pop(name, None)
+        else:
+            self._pins[name] -= 1
+
+    async def evict(self):
+        async with self._evict_lock:
+            total = sum(e.get("size") or 0 for e in self.entries.values())
+            if total <= self.max_bytes:
+                return
+            for name, entry in sorted(self.entries.items(), key=lambda item: item[1]["used_at"]):
+                if total <= self.max_bytes:
+                    break
+                lock = self._locks.setdefault(name, asyncio.Lock())
+                if self._pins.get(name) or lock.locked():
+                    continue
+                async with lock:
+                    if self._pins.get(name) or name not in self.entries:
+                        continue
+                    repo_path = os.path.join(self.root, name)
+                    await run_blocking(shutil.rmtree, repo_path, True)
+                    await run_blocking(drop_index, repo_path)
+                    total -= entry.get("size") or 0
+                    self.entries.pop(name, None)
+                    self.evictions += 1
+            await run_blocking(self._save)
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "repos": len(self.entries),
+            "bytes": sum(e.get("size") or 0 for e in self.entries.values()),
+            "clones": self.clones,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+        }
+
+
+repo_cache = RepoCache()
@@ -1,8 +1,23 @@
+import os
 import json
-import subprocess
-from fastmcp import FastMCP
-from typing import List, Dict, Any
-from services.mco.github_search import search_github_repos, clone_repo
+import base64
+import asyncio
+from contextlib import aclosing
+from fastmcp import FastMCP, Context
+from typing import List, Dict, Any, Set, Tuple, AsyncIterator
+from services.mco.github_search import search_github_repos, repo_cache, run_process
+from services.mco.trigram_index import ensure_index
+from services.blocking import run_blocking
+
+# repos cloned (and grepped) at the same time within one remote_grep call
+CLONE_CONCURRENCY = int(os.getenv("MCP_CLONE_CONCURRENCY", "4"))
+# past this many candidate files rg is pointed at the whole checkout instead
+TRIGRAM_MAX_CANDIDATES = int(os.getenv("TRIGRAM_MAX_CANDIDATES", "2000"))
+# files larger than this are skipped by rg, which also bounds a single JSON record
+RG_MAX_FILESIZE = os.getenv("RG_MAX_FILESIZE", "1M")
+RG_LINE_LIMIT = 8 * 1024 * 1024
+# most snippets sent in one remote_grep progress notification
+PROGRESS_BATCH_SIZE = int(os.getenv("MCP_PROGRESS_BATCH_SIZE", "5"))
 
 # -----------------------------
 # Load tools metadata (optional)
@@ -14,49 +29,215 @@ with open(TOOLS_FILE) as f:
 # Create the FastMCP server
 mcp = FastMCP(name="Remote GitHub Grep MCP Server")
 
-def grep_repo_for_code(repo_path: str, query: str, max_results: int) -> List[str]:
-    """Return the matching code lines from a repo."""
-    cmd = [
+def grep_command(paths: List[str], query: str, max_results: int) -> List[str]:
+    return [
         "rg",  # ripgrep
-        query,
-        repo_path,
-        "--line-number",
-        "--no-heading",
+        "--json",
         "--max-count",
-        str(max_results)
+        str(max_results),
+        "--max-filesize",
+        RG_MAX_FILESIZE,
+        "--regexp",
+        query,
+        "--",
+        *paths,
     ]
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    code_snippets = []
-    for line in proc.stdout.splitlines():
-        parts = line.split(":", 2)
-        if len(parts) == 3:
-            code_snippets.append(parts[2].strip())
-    return code_snippets
+
+def _rg_text(field: Dict[str, Any]) -> str:
+    # rg reports non-UTF-8 paths and lines base64 encoded
+    if "text" in field:
+        return field["text"]
+    return base64.b64decode(field["bytes"]).decode("utf-8", errors="replace")
+
+async def rg_files(index) -> Set[str]:
+    """
+    Paths (relative to the checkout) rg searches on its own, i.e. without
+    hidden and ignored files. Explicit file arguments bypass those rules,
+    so candidates are filtered through this list. Listed once per git stamp.
+    """
+    stamp = index.meta.get("stamp")
+    if index.rg_files is not None and stamp is not None and index.rg_files[0] == stamp:
+        return index.rg_files[1]
+    _, stdout = await run_process("rg", "--files", "--null", "--", index.repo_path)
+    files = {
+        os.path.relpath(path, index.repo_path)
+        for path in stdout.decode("utf-8", errors="surrogateescape").split("\0") if path
+    }
+    index.rg_files = (stamp, files)
+    return files
+
+async def search_paths(repo_path: str, query: str) -> List[str]:
+    """
+    What rg has to look at in one checkout: the candidate files from the
+    repo's trigram index, the whole checkout, or nothing at all.
+    """
+    index = await run_blocking(ensure_index, repo_path)
+    candidates = await run_blocking(index.candidates, query)
+    if candidates is None or len(candidates) > TRIGRAM_MAX_CANDIDATES:
+        return [repo_path]
+    if not candidates:
+        return []
+    searchable = await rg_files(index)
+    return [os.path.join(repo_path, path) for path in candidates if path in searchable]
+
+async def stream_grep(
+    targets: List[Tuple[str, str, List[str]]], query: str, max_results: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    One rg --json process over every (repo_url, repo_path, paths) target.
+    Matches are yielded as rg finds them, mapped back to repository, path
+    and line number; rg is killed once max_results are out (or the caller
+    is cancelled), so neither memory nor time grows with repo size.
+    """
+    # longest checkout path first, so nested names cannot steal matches
+    roots = sorted(
+        ((os.path.join(repo_path, ""), repo_url) for repo_url, repo_path, _ in targets),
+        key=lambda root: len(root[0]),
+        reverse=True,
+    )
+    paths = [path for _, _, repo_paths in targets for path in repo_paths]
+
+    proc = await asyncio.create_subprocess_exec(
+        *grep_command(paths, query, max_results),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        limit=RG_LINE_LIMIT,
+    )
+    found = 0
+    finished = False
+    try:
+        while found < max_results:
+            try:
+                raw = await proc.stdout.readline()
+            except ValueError:
+                # a JSON record longer than the stream limit: the reader drops
+                # what it has buffered and the rest of the record arrives as
+                # the next line, which fails to parse below and is skipped too
+                continue
+            if not raw:
+                finished = True
+                break
+            try:
+                event = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if event["type"] != "match":
+                continue
+
+            data = event["data"]
+            path = _rg_text(data["path"])
+            repo_url, rel_path = next(
+                ((url, os.path.relpath(path, root)) for root, url in roots if path.startswith(root)),
+                (None, path),
+            )
+            found += 1
+            yield {
+                "repository": repo_url,
+                "path": rel_path,
+                "line": data["line_number"],
+                "code": _rg_text(data["lines"]).strip(),
+            }
+    finally:
+        # only kill an rg that is still producing output; signalling one that
+        # already exited races the event loop's child watcher
+        if not finished and proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+
+async def grep_batches(
+    query: str, language: str, max_repos: int, max_results: int
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    remote_grep as a stream of snippet batches. A batch is cut whenever the
+    matches move on to another repository, reach PROGRESS_BATCH_SIZE, or an
+    rg round ends, so callers see the first results long before slow
+    clones finish.
+    """
+    found = 0
+    repos = await run_blocking(search_github_repos, query, language, max_repos)
+
+    slots = asyncio.Semaphore(CLONE_CONCURRENCY)
+
+    async def clone(repo_url: str):
+        async with slots:
+            return repo_url, await repo_cache.acquire(repo_url, language)
+
+    tasks = [asyncio.create_task(clone(repo_url)) for repo_url in repos]
+    ready: asyncio.Queue = asyncio.Queue()
+    for task in tasks:
+        task.add_done_callback(ready.put_nowait)
+
+    pending = len(tasks)
+    try:
+        while pending and found < max_results:
+            # every repo that is ready by now shares one rg process; the ones
+            # still cloning are picked up by the next round
+            batch = [await ready.get()]
+            while not ready.empty():
+                batch.append(ready.get_nowait())
+            pending -= len(batch)
+
+            cloned = []
+            for task in batch:
+                if task.cancelled():
+                    continue
+                if task.exception():
+                    # one unreachable repo should not sink the others
+                    print(f"remote_grep: skipping repo: {task.exception()}")
+                    continue
+                cloned.append(task.result())
+
+            searched = await asyncio.gather(*(search_paths(repo_path, query) for _, repo_path in cloned))
+            targets = [
+                (repo_url, repo_path, paths)
+                for (repo_url, repo_path), paths in zip(cloned, searched)
+                if paths
+            ]
+            if not targets:
+                continue
+
+            snippets: List[Dict[str, Any]] = []
+            async with aclosing(stream_grep(targets, query, max_results - found)) as hits:
+                async for hit in hits:
+                    if snippets and (
+                        hit["repository"] != snippets[-1]["repository"] or len(snippets) >= PROGRESS_BATCH_SIZE
+                    ):
+                        yield snippets
+                        snippets = []
+                    snippets.append(hit)
+                    found += 1
+            if snippets:
+                yield snippets
+    finally:
+        # enough results (or the client went away): stop outstanding clones
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # checkouts may be evicted again once nobody is searching them
+        for task in tasks:
+            if not task.cancelled() and task.exception() is None:
+                repo_cache.release(task.result()[1])
 
 @mcp.tool
-def remote_grep(
+async def remote_grep(
     query: str,
     language: str = "python",
     max_repos: int = 3,
-    max_results: int = 20
+    max_results: int = 20,
+    ctx: Context = None
 ) -> List[Dict[str, Any]]:
     """
     Search GitHub repos for a query and return code snippets directly.
+    Partial results are sent as progress notifications while the search runs.
     """
     results: List[Dict[str, Any]] = []
-    repos = search_github_repos(query, language, max_repos)
-
-    for repo_url in repos:
-        repo_path = clone_repo(repo_url)
-        snippets = grep_repo_for_code(repo_path, query, max_results)
-        for snippet in snippets:
-            results.append({
-                "repository": repo_url,
-                "code": snippet
-            })
-    
-    # Limit total results across all repos
-    return results[:max_results]
+    async with aclosing(grep_batches(query, language, max_repos, max_results)) as batches:
+        async for batch in batches:
+            results.extend(batch)
+            if ctx is not None:
+                # the batch rides along as JSON in the progress message
+                await ctx.report_progress(len(results), max_results, json.dumps(batch))
+    return results
 
 if __name__ == "__main__":
     mcp.run(host="127.0.0.1", port=9000, transport="http")
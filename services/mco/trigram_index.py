@@ -0,0 +1,416 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# On-disk trigram index per checkout in repo_cache, used by remote_grep to
+# hand rg only the files that can possibly match.
+#
+# <repo_cache>/.index/<repo>/
+#   meta.json       git stamp the index was built at, indexed files with (mtime_ns, size)
+#   trigrams.npy    sorted unique trigrams (uint32, 3 lowercased bytes)
+#   offsets.npy     postings of trigrams[i] are postings[offsets[i]:offsets[i + 1]]
+#   postings.npy    file ids (uint32) into meta["files"]
+#
+# The arrays are memory-mapped, so opening an index costs no more than
+# reading meta.json. When git updates the checkout only added or modified
+# files are read again.
+
+TRIGRAM_MAX_FILE_BYTES = int(os.getenv("TRIGRAM_MAX_FILE_BYTES", str(1024 * 1024)))
+INDEX_VERSION = 2
+
+_REGEX_META = set(".^$*+?()[]{}|\\")
+# escapes that stand for one literal character
+_LITERAL_ESCAPES = set(".^$*+?()[]{}|\\/-#&~ \"'")
+# escapes followed by an argument: \x7F \x{10FFFF} \u007F \U0010FFFF \pL \p{Greek}
+_HEX_ESCAPES = {"x": 2, "u": 4, "U": 8}
+_HEX_DIGITS = set("0123456789abcdefABCDEF")
+# (?x) ignores whitespace in the pattern, so literal runs are not what they look like
+_VERBOSE_FLAG = re.compile(r"\(\?[a-zA-Z-]*x")
+# (?i) folds case the Unicode way (ä/Ä, k/K U+212A, s/ſ U+017F), the index only folds ASCII bytes
+_CASELESS_FLAG = re.compile(r"\(\?[a-zA-Z]*i")
+_UNFOLDABLE = re.compile(r"[^\x00-\x7f]|[kKsS]")
+
+
+def _git_stamp(repo_path: str) -> Optional[str]:
+    """
+    Stat of .git/index, which git rewrites whenever it changes the working
+    tree (clone, checkout, reset, sparse-checkout). No subprocess needed.
+    """
+    try:
+        st = os.stat(os.path.join(repo_path, ".git", "index"))
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _walk(repo_path: str) -> Dict[str, Tuple[int, int]]:
+    """
+    path relative to the checkout -> (mtime_ns, size) for every file outside .git
+    """
+    stats = {}
+    for dirpath, dirnames, filenames in os.walk(repo_path):
+        dirnames[:] = [d for d in dirnames if d != ".git"]
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            stats[os.path.relpath(full, repo_path)] = (st.st_mtime_ns, st.st_size)
+    return stats
+
+
+def file_trigrams(data: bytes) -> Optional[np.ndarray]:
+    """
+    Unique trigrams of the lowercased bytes, or None for binary content.
+    """
+    if b"\0" in data[:8192]:
+        return None
+    a = np.frombuffer(data.lower(), dtype=np.uint8).astype(np.uint32)
+    if len(a) < 3:
+        return np.empty(0, dtype=np.uint32)
+    return np.unique((a[:-2] << 16) | (a[1:-1] << 8) | a[2:])
+
+
+def _literal_trigrams(literal: str) -> np.ndarray:
+    # lowercase the bytes like the indexed files, not the str (non-ASCII case differs)
+    data = literal.encode("utf-8").lower()
+    if len(data) < 3:
+        return np.empty(0, dtype=np.uint32)
+    return file_trigrams(data)
+
+
+def _escape_end(pattern: str, i: int) -> int:
+    """
+    Index just past the escape starting at pattern[i] (the backslash),
+    including its argument, so e.g. the 41 of \x41 is never read as text.
+    """
+    kind = pattern[i + 1]
+    j = i + 2
+    if kind in _HEX_ESCAPES or kind in "pP":
+        if j < len(pattern) and pattern[j] == "{":
+            close = pattern.find("}", j)
+            return close + 1 if close != -1 else len(pattern)
+        if kind in "pP":
+            return j + 1
+        end = j
+        while end < len(pattern) and end - j < _HEX_ESCAPES[kind] and pattern[end] in _HEX_DIGITS:
+            end += 1
+        return end
+    return j
+
+
+def _class_end(pattern: str, i: int) -> int:
+    """
+    Index just past the character class opened at pattern[i], or -1.
+    Handles a leading ] or ^], escapes, [:alpha:] and nested classes.
+    """
+    j = i + 1
+    if j < len(pattern) and pattern[j] == "^":
+        j += 1
+    if j < len(pattern) and pattern[j] == "]":
+        j += 1
+    depth = 1
+    while j < len(pattern):
+        c = pattern[j]
+        if c == "\\":
+            if j + 1 >= len(pattern):
+                return -1
+            j = _escape_end(pattern, j)
+            continue
+        if pattern.startswith("[:", j):
+            close = pattern.find(":]", j + 2)
+            if close != -1:
+                j = close + 2
+                continue
+        if c == "[":
+            depth += 1
+            j += 1
+            if j < len(pattern) and pattern[j] == "^":
+                j += 1
+            if j < len(pattern) and pattern[j] == "]":
+                j += 1
+            continue
+        if c == "]":
+            depth -= 1
+            if depth == 0:
+                return j + 1
+        j += 1
+    return -1
+
+
+def required_literals(pattern: str) -> Optional[List[str]]:
+    """
+    Literal runs every match of the regex must contain, or None when the
+    pattern cannot be narrowed (top-level alternation, verbose mode,
+    unparsable input). Conservative: anything uncertain (a class, an
+    escape other than an escaped metacharacter, a group) ends the current run,
+    and so does, under (?i), a character with a non-ASCII case variant.
+    """
+    if _VERBOSE_FLAG.search(pattern):
+        return None
+    runs: List[str] = []
+    current: List[str] = []
+    depth = 0
+    i = 0
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= len(pattern):
+                return None
+            nxt = pattern[i + 1]
+            if depth == 0 and nxt in _LITERAL_ESCAPES:
+                current.append(nxt)
+                i += 2
+            else:
+                flush()
+                i = _escape_end(pattern, i)
+            continue
+        if c == "|" and depth == 0:
+            return None
+        if c in "*?{":
+            # the previous character is optional (or repeated from zero)
+            if current:
+                current.pop()
+            flush()
+            if c == "{":
+                close = pattern.find("}", i)
+                i = close + 1 if close != -1 else len(pattern)
+                continue
+        elif c == "+":
+            flush()
+        elif c == "[":
+            flush()
+            end = _class_end(pattern, i)
+            if end == -1:
+                return None
+            i = end
+            continue
+        elif c == "(":
+            flush()
+            depth += 1
+        elif c == ")":
+            flush()
+            depth -= 1
+            # a group may be optional or repeated; its contents were never collected
+            if i + 1 < len(pattern) and pattern[i + 1] in "*?{":
+                i += 1
+                continue
+        elif c in _REGEX_META or depth > 0:
+            flush()
+        else:
+            current.append(c)
+        i += 1
+
+    flush()
+    if _CASELESS_FLAG.search(pattern):
+        runs = [part for run in runs for part in _UNFOLDABLE.split(run) if part]
+    return runs
+
+
+class TrigramIndex:
+    def __init__(self, repo_path: str, index_dir: str):
+        self.repo_path = repo_path
+        self.index_dir = index_dir
+        self.meta: Dict = {}
+        self.trigrams = np.empty(0, dtype=np.uint32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.empty(0, dtype=np.uint32)
+        # held while the four fields above are swapped or read together
+        self._lock = threading.Lock()
+        # (stamp, paths) rg itself would search, filled in by the MCP server
+        self.rg_files: Optional[Tuple[Optional[str], Set[str]]] = None
+
+    # ---------- persistence ----------
+
+    def _load(self) -> bool:
+        try:
+            with open(os.path.join(self.index_dir, "meta.json")) as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                return False
+            trigrams = np.load(os.path.join(self.index_dir, "trigrams.npy"), mmap_mode="r")
+            offsets = np.load(os.path.join(self.index_dir, "offsets.npy"), mmap_mode="r")
+            postings = np.load(os.path.join(self.index_dir, "postings.npy"), mmap_mode="r")
+        except (OSError, ValueError):
+            return False
+        with self._lock:
+            self.meta, self.trigrams, self.offsets, self.postings = meta, trigrams, offsets, postings
+        return True
+
+    def _save(self, meta: Dict, trigrams: np.ndarray, offsets: np.ndarray, postings: np.ndarray):
+        os.makedirs(self.index_dir, exist_ok=True)
+        # write next to the live files and swap, readers keep their old mmaps
+        for name, arr in (("trigrams", trigrams), ("offsets", offsets), ("postings", postings)):
+            tmp = os.path.join(self.index_dir, f"{name}.tmp.npy")
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(self.index_dir, f"{name}.npy"))
+        tmp = os.path.join(self.index_dir, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.index_dir, "meta.json"))
+
+    # ---------- build ----------
+
+    def _pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (trigram, file id) pairs of the current index.
+        """
+        counts = np.diff(np.asarray(self.offsets))
+        return np.repeat(np.asarray(self.trigrams), counts), np.asarray(self.postings)
+
+    def refresh(self, stamp: Optional[str] = None) -> Dict[str, int]:
+        """
+        Bring the index up to date with the checkout, re-reading only files
+        whose mtime or size changed.
+        """
+        start = time.perf_counter()
+        stats = _walk(self.repo_path)
+        old_files = self.meta.get("files", [])
+        old_stats = self.meta.get("stats", {})
+
+        keep_ids = [
+            i for i, path in enumerate(old_files)
+            if path in stats and tuple(old_stats.get(path, ())) == stats[path]
+        ]
+        kept = {old_files[i] for i in keep_ids}
+        binary = [
+            p for p in self.meta.get("binary", [])
+            if p in stats and tuple(old_stats.get(p, ())) == stats[p]
+        ]
+        kept.update(binary)
+        todo = sorted(p for p in stats if p not in kept and stats[p][1] <= TRIGRAM_MAX_FILE_BYTES)
+
+        files = [old_files[i] for i in keep_ids]
+        remap = np.full(len(old_files) + 1, -1, dtype=np.int64)
+        remap[keep_ids] = np.arange(len(keep_ids))
+
+        tri_parts, id_parts = [], []
+        if keep_ids:
+            tri, ids = self._pairs()
+            new_ids = remap[ids]
+            mask = new_ids >= 0
+            tri_parts.append(tri[mask])
+            id_parts.append(new_ids[mask].astype(np.uint32))
+
+        for path in todo:
+            try:
+                with open(os.path.join(self.repo_path, path), "rb") as f:
+                    grams = file_trigrams(f.read())
+            except OSError:
+                continue
+            if grams is None:
+                binary.append(path)
+                continue
+            tri_parts.append(grams)
+            id_parts.append(np.full(len(grams), len(files), dtype=np.uint32))
+            files.append(path)
+
+        tri = np.concatenate(tri_parts) if tri_parts else np.empty(0, dtype=np.uint32)
+        ids = np.concatenate(id_parts) if id_parts else np.empty(0, dtype=np.uint32)
+        order = np.lexsort((ids, tri))
+        tri, ids = tri[order], ids[order]
+        trigrams, first = np.unique(tri, return_index=True)
+        offsets = np.append(first, len(tri)).astype(np.int64)
+
+        meta = {
+            "version": INDEX_VERSION,
+            "stamp": stamp,
+            "files": files,
+            "stats": {p: stats[p] for p in files + binary},
+            # too big to index: always handed to rg
+            "unindexed": sorted(p for p in stats if stats[p][1] > TRIGRAM_MAX_FILE_BYTES),
+            "binary": binary,
+        }
+        self._save(meta, trigrams, offsets, ids)
+        with self._lock:
+            self.meta, self.trigrams, self.offsets, self.postings = meta, trigrams, offsets, ids
+        return {
+            "files": len(files),
+            "reindexed": len(todo),
+            "ms": int((time.perf_counter() - start) * 1000),
+        }
+
+    # ---------- query ----------
+
+    def _posting(self, trigram: int) -> np.ndarray:
+        i = int(np.searchsorted(self.trigrams, trigram))
+        if i >= len(self.trigrams) or self.trigrams[i] != trigram:
+            return np.empty(0, dtype=np.uint32)
+        return np.asarray(self.postings[self.offsets[i]:self.offsets[i + 1]])
+
+    def candidates(self, pattern: str) -> Optional[List[str]]:
+        """
+        Files (relative paths) that may contain a match, or None when the
+        pattern gives nothing to narrow on and every file has to be searched.
+        """
+        literals = required_literals(pattern)
+        if literals is None:
+            return None
+        grams = [g for lit in literals for g in _literal_trigrams(lit)]
+        if not grams:
+            return None
+
+        # refresh() may swap in a new generation from another thread meanwhile
+        with self._lock:
+            ids = None
+            # rarest trigrams first keeps the intersections small
+            postings = sorted((self._posting(int(g)) for g in set(grams)), key=len)
+            for posting in postings:
+                ids = posting if ids is None else np.intersect1d(ids, posting, assume_unique=True)
+                if len(ids) == 0:
+                    break
+
+            files = self.meta["files"]
+            return [files[i] for i in ids] + self.meta["unindexed"]
+
+
+_indexes: Dict[str, TrigramIndex] = {}
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def index_dir_for(repo_path: str) -> str:
+    cache_dir, name = os.path.split(os.path.normpath(repo_path))
+    return os.path.join(cache_dir, ".index", name)
+
+
+def ensure_index(repo_path: str) -> TrigramIndex:
+    """
+    Open (building or updating as needed) the index of a checkout. Cheap
+    when git has not touched the checkout since the last call.
+    """
+    with _locks_guard:
+        lock = _locks.setdefault(repo_path, threading.Lock())
+
+    with lock:
+        stamp = _git_stamp(repo_path)
+        index = _indexes.get(repo_path)
+        if index is None:
+            index = TrigramIndex(repo_path, index_dir_for(repo_path))
+            index._load()
+            _indexes[repo_path] = index
+        if stamp is None or index.meta.get("stamp") != stamp:
+            stats = index.refresh(stamp)
+            print(f"trigram index {repo_path}: {stats}")
+        return index
+
+
+def drop_index(repo_path: str):
+    """
+    Forget a checkout's index, e.g. when the repo is evicted from the cache.
+    """
+    _indexes.pop(repo_path, None)
+    shutil.rmtree(index_dir_for(repo_path), ignore_errors=True)
@@ -6,6 +6,8 @@
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from pydantic import BaseModel, Field
+from typing import List, Dict, Literal
 import os
 
 load_dotenv()
@@ -69,6 +71,35 @@ orchestrator_prompts = ChatPromptTemplate.from_template(
     - Even for non-technical topics, think: "Is there likely a dataset or specialized tool for this on GitHub?" 
     - For example, a geography topic like "Mountains" would need 'web' for facts.
 
+    Answer format:
+    - One route per tool you pick, with its worker name ('web', 'git' or 'db').
+    - confidence: 0 to 1, how much that tool will add to the research.
+    - sub_queries: up to 3 focused search queries for that tool.
+    """
+)
+
+
+# Plain list reply, parsed with split("'") by the legacy multi_agent.py graph
+legacy_orchestrator_prompts = ChatPromptTemplate.from_template(
+    """
+    You are a professional research orchestrator. Your goal is to determine which search tools are required to gather comprehensive information on a content.
+
+    USER_CONTENT (Content to research):
+    {user_content}
+
+    DB_CONTENT (Existing database titles):
+    {db_content}
+
+    Selection Criteria for Options:
+    1. 'web': Use for general facts, news, official websites, and broad overviews.
+    2. 'git': Use if the topic asked for code demos, public repositories or public github repositories files 
+    3. 'db': Use ONLY if the content closely matches or overlaps with one of the titles in DB_CONTENT.
+
+    Instructions:
+
+    - Even for non-technical topics, think: "Is there likely a dataset or specialized tool for this on GitHub?" 
+    - For example, a geography topic like "Mountains" would need 'web' for facts.
+
     Answer format:
     - Return ONLY a Python list of strings.
     - No explanation, no intro text.
@@ -76,24 +107,42 @@ orchestrator_prompts = ChatPromptTemplate.from_template(
 )
 
 
-response = orchestrator_model.invoke(
-    orchestrator_prompts.format_messages(
-        user_content="Explain langchain",
-        db_content=['Langchain with postgres', 'Vector search', 'Large language models']
-    )
-)
+# Workers below this confidence are not run at all
+ROUTE_MIN_CONFIDENCE = float(os.getenv("ROUTE_MIN_CONFIDENCE", "0.5"))
+
+
+class WorkerRoute(BaseModel):
+    worker: Literal["web", "git", "db"] = Field(description="Search tool to run")
+    confidence: float = Field(ge=0, le=1, description="How useful this tool is for the content, 0 to 1")
+    sub_queries: List[str] = Field(default_factory=list, description="Focused queries for this tool")
 
-print(response.content)
-print(type(response.content))
 
-ans = response.content
+class OrchestratorDecision(BaseModel):
+    routes: List[WorkerRoute] = Field(description="Tools to run, one entry per tool")
 
-l = []
 
-for a in ans.split(','):
-    print(a.split("'")[1])
-    l.append(a.split("'")[1])
+orchestrator_router = orchestrator_model.with_structured_output(OrchestratorDecision)
 
 
+def confident_workers(confidence: Dict[str, float], threshold: float = ROUTE_MIN_CONFIDENCE) -> List[str]:
+    """
+    Workers at or above the threshold; the single best one if none qualifies.
+    """
+    workers = [w for w, c in confidence.items() if c >= threshold]
+    if not workers and confidence:
+        workers = [max(confidence, key=confidence.get)]
+    return workers
+
+
+if __name__ == "__main__":
+    decision = orchestrator_router.invoke(
+        orchestrator_prompts.format_messages(
+            user_content="Explain langchain",
+            db_content=['Langchain with postgres', 'Vector search', 'Large language models']
+        )
+    )
+
+    for route in decision.routes:
+        print(route.worker, route.confidence, route.sub_queries)
 
-print(l)
\ No newline at end of file
+    print(confident_workers({r.worker: r.confidence for r in decision.routes}))
@@ -0,0 +1,132 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+from services.fast_router import normalize_topic, topic_terms
+from services.hashing_vectorizer import tf_vector, smooth_idf, l2_normalize
+
+RESEARCH_CACHE_TTL_SECONDS = float(os.getenv("RESEARCH_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESEARCH_CACHE_SIMILARITY = float(os.getenv("RESEARCH_CACHE_SIMILARITY", "0.85"))
+RESEARCH_CACHE_MAX_SIZE = int(os.getenv("RESEARCH_CACHE_MAX_SIZE", "256"))
+RESEARCH_CACHE_DIM = int(os.getenv("RESEARCH_CACHE_DIM", "4096"))
+
+
+class ResearchCache:
+    """
+    Finished research summaries keyed by normalized topic.
+
+    Topics are matched first by exact normalized key, then by cosine
+    similarity of hashed TF-IDF vectors held in one NumPy matrix (a row
+    per entry). Entries expire after the TTL and the least recently used
+    one is evicted when the cache is full.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESEARCH_CACHE_TTL_SECONDS,
+        threshold: float = RESEARCH_CACHE_SIMILARITY,
+        max_size: int = RESEARCH_CACHE_MAX_SIZE,
+        dim: int = RESEARCH_CACHE_DIM,
+    ):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_size = max_size
+        self.dim = dim
+        self._tf = np.zeros((max_size, dim), dtype=np.float32)
+        self._used = np.zeros(max_size, dtype=bool)
+        self._row_key: List[Optional[str]] = [None] * max_size
+        # key -> {"row", "topic", "summary", "created_at"}, least recently used first
+        self._entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # lookups and stores arrive from concurrent sessions' executor threads
+        self._lock = threading.Lock()
+
+    def _vector(self, topic: str) -> np.ndarray:
+        return tf_vector(topic_terms(topic), self.dim)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self._used[entry["row"]] = False
+        self._row_key[entry["row"]] = None
+        self._tf[entry["row"]] = 0.0
+
+    def _expire(self):
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e["created_at"] > self.ttl]:
+            self._drop(key)
+
+    def lookup(self, topic: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached entry for the topic or a close enough one, with its similarity.
+        """
+        key = normalize_topic(topic)
+        query = self._vector(topic)
+        with self._lock:
+            return self._lookup(key, query)
+
+    def _lookup(self, key: str, query: np.ndarray) -> Optional[Dict[str, Any]]:
+        self._expire()
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {**self._entries[key], "similarity": 1.0}
+
+        if not self._entries or not key:
+            self.misses += 1
+            return None
+
+        rows = np.flatnonzero(self._used)
+        tf = self._tf[rows]
+        idf = smooth_idf(np.count_nonzero(tf, axis=0), len(rows))
+        scores = l2_normalize(tf * idf) @ l2_normalize(query * idf)
+
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        key = self._row_key[rows[best]]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return {**self._entries[key], "similarity": float(scores[best])}
+
+    def store(self, topic: str, summary: str):
+        key = normalize_topic(topic)
+        if not key:
+            return
+        vector = self._vector(topic)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while len(self._entries) >= self.max_size:
+                self._drop(next(iter(self._entries)))
+
+            row = int(np.flatnonzero(~self._used)[0])
+            self._used[row] = True
+            self._row_key[row] = key
+            self._tf[row] = vector
+            self._entries[key] = {
+                "row": row,
+                "topic": topic,
+                "summary": summary,
+                "created_at": time.time(),
+            }
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {
+            "size": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+research_cache = ResearchCache()
@@ -0,0 +1,143 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Content-addressed store for the repo summarizer (services/g.py).
+#
+# blobs       git blob sha -> file content, so unchanged files are not downloaded again
+# summaries   (blob sha, chunk offset, model, prompt version) -> chunk summary
+#
+# Both tables share one size budget; least recently used rows go first.
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", ".cache/summary_cache.sqlite3")
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def git_blob_sha(content: str) -> str:
+    """
+    The sha GitHub reports for a file with this content.
+    """
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def summary_key(blob_sha: str, offset: int, length: int, model: str, prompt_version: str) -> str:
+    return f"{blob_sha}:{offset}+{length}:{model}:{prompt_version}"
+
+
+class SummaryCache:
+    def __init__(self, path: str = SUMMARY_CACHE_PATH, max_bytes: int = SUMMARY_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # bytes in both tables, summed once on open and kept up to date by _put/_evict
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.blob_hits = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for table in ("blobs", "summaries"):
+                conn.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+                self._total += conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _get_many(self, table: str, keys: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            # sqlite caps bound parameters, look up in slices
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                for key, value in db.execute(f"SELECT key, value FROM {table} WHERE key IN ({marks})", part):
+                    found[key] = value
+                db.executemany(f"UPDATE {table} SET accessed_at = ? WHERE key = ?", [(now, k) for k in found if k in part])
+            db.commit()
+        return found
+
+    def _put(self, table: str, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            db = self._db()
+            old = db.execute(f"SELECT size FROM {table} WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, batch: int = 256):
+        # least recently used first across both tables, a batch at a time off the accessed_at indexes
+        while self._total > self.max_bytes:
+            rows = sorted(
+                (accessed_at, table, key, size)
+                for table in ("blobs", "summaries")
+                for key, size, accessed_at in db.execute(
+                    f"SELECT key, size, accessed_at FROM {table} ORDER BY accessed_at LIMIT ?", (batch,)
+                )
+            )[:batch]
+            if not rows:
+                self._total = 0
+                return
+            doomed = {"blobs": [], "summaries": []}
+            for _, table, key, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                doomed[table].append((key,))
+                self._total -= size
+            for table, keys in doomed.items():
+                db.executemany(f"DELETE FROM {table} WHERE key = ?", keys)
+
+    def get_summaries(self, keys: List[str]) -> Dict[str, str]:
+        found = self._get_many("summaries", keys)
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_summary(self, key: str, summary: str):
+        self._put("summaries", key, summary)
+
+    def get_blobs(self, shas: List[str]) -> Dict[str, str]:
+        found = self._get_many("blobs", shas)
+        self.blob_hits += len(found)
+        return found
+
+    def put_blob(self, sha: str, content: str):
+        self._put("blobs", sha, content)
+
+    def metrics(self) -> Dict[str, int]:
+        return {"summary_hits": self.hits, "summary_misses": self.misses, "blob_hits": self.blob_hits}
+
+
+summary_cache = SummaryCache()
@@ -1,16 +1,15 @@
-from services.content import contents
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
 
 
-def split_text_into_chunks(contents):
+def split_text_into_chunks(contents, chunk_size=10000, chunk_overlap=1000):
     # 1. Initialize the splitter
     text_splitter = RecursiveCharacterTextSplitter(
         # Groq's limit is roughly tokens, but this splitter counts CHARACTERS.
         # 1 token is ~4 characters. So 4000 tokens ≈ 16000 characters.
-        chunk_size=10000, 
-        chunk_overlap=1000, # Overlap ensures context isn't cut in half
+        chunk_size=chunk_size, 
+        chunk_overlap=chunk_overlap, # Overlap ensures context isn't cut in half
         length_function=len,
         separators=["\n\n", "\n", " ", ""] # Order of priority for splitting
     )
@@ -27,4 +26,4 @@ def split_text_into_chunks(contents):
 # print(chunks)
 # print("\n \n")
 
-# print(f"Total chunks created: {len(chunks)}")
\ No newline at end of file
+# print(f"Total chunks created: {len(chunks)}")
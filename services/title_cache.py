@@ -0,0 +1,127 @@
+import os
+import asyncio
+from typing import List, Dict
+
+import psycopg
+from psycopg import sql
+from dotenv import load_dotenv
+
+from services.db_pool import pg_connection, DB_URL
+from services.title_index import TitleIndex
+
+load_dotenv()
+
+# Channel fired by save_db_node (pg_notify) whenever a document is inserted.
+# Payload is the new title; an empty payload asks listeners to reload.
+DOCUMENTS_CHANNEL = os.getenv("DOCUMENTS_CHANNEL", "documents_inserted")
+TITLE_LISTEN_RETRY_SECONDS = float(os.getenv("TITLE_LISTEN_RETRY_SECONDS", "5"))
+TITLE_LISTEN_READY_TIMEOUT = float(os.getenv("TITLE_LISTEN_READY_TIMEOUT", "5"))
+
+# pg_notify payloads must be shorter than 8000 bytes
+MAX_NOTIFY_PAYLOAD = 7999
+
+
+def notify_payload(title: str) -> str:
+    if len(title.encode("utf-8")) > MAX_NOTIFY_PAYLOAD:
+        return ""
+    return title
+
+
+class TitleCache:
+    """
+    In-process copy of documents.title.
+
+    Loaded once with a single query, then kept current by LISTEN on
+    DOCUMENTS_CHANNEL. Reads are served from memory while the listener is
+    connected; if it drops, the next read falls back to a fresh snapshot.
+    """
+
+    def __init__(self, channel: str = DOCUMENTS_CHANNEL):
+        self.channel = channel
+        self.version = 0
+        self._titles: Dict[str, None] = {}  # insertion ordered, de-duplicated
+        self._loaded = False
+        self._listening = asyncio.Event()
+        self._listener: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._index: TitleIndex | None = None
+        self._index_version = -1
+
+    async def get_titles(self) -> List[str]:
+        if not (self._loaded and self._listening.is_set()):
+            await self._load()
+        return list(self._titles)
+
+    async def get_index(self) -> TitleIndex:
+        """
+        BM25 index over the cached titles, rebuilt only when they change.
+        """
+        titles = await self.get_titles()
+        version = self.version
+        if self._index is None or self._index_version != version:
+            self._index = await asyncio.to_thread(TitleIndex, titles)
+            self._index_version = version
+        return self._index
+
+    def add(self, title: str):
+        if title not in self._titles:
+            self._titles[title] = None
+            self.version += 1
+
+    def invalidate(self):
+        self._loaded = False
+
+    async def _load(self):
+        async with self._lock:
+            if self._loaded and self._listening.is_set():
+                return
+
+            # LISTEN before taking the snapshot so no insert can fall in between
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.create_task(self._listen())
+                try:
+                    await asyncio.wait_for(self._listening.wait(), TITLE_LISTEN_READY_TIMEOUT)
+                except asyncio.TimeoutError:
+                    print("Title cache: listener not ready, serving a one-off snapshot")
+
+            async with pg_connection() as conn:
+                cur = await conn.execute("SELECT title FROM documents")
+                rows = await cur.fetchall()
+
+            self._titles = dict.fromkeys(r[0] for r in rows)
+            self._loaded = True
+            self.version += 1
+
+    async def _listen(self):
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(DB_URL, autocommit=True)
+                async with conn:
+                    await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    self._listening.set()
+                    async for notify in conn.notifies():
+                        if notify.payload:
+                            self.add(notify.payload)
+                        else:
+                            self.invalidate()
+            except psycopg.OperationalError as e:
+                print(f"Title cache listener error: {e}")
+
+            # notifications may have been missed while disconnected
+            self._listening.clear()
+            self.invalidate()
+            await asyncio.sleep(TITLE_LISTEN_RETRY_SECONDS)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._listening.clear()
+        self._loaded = False
+
+
+title_cache = TitleCache()
@@ -0,0 +1,90 @@
+import os
+import re
+from typing import List, Dict
+
+import numpy as np
+
+# Number of DB titles handed to the orchestrator prompt
+DB_TITLES_TOP_K = int(os.getenv("DB_TITLES_TOP_K", "20"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class TitleIndex:
+    """
+    BM25 index over document titles.
+
+    Postings are stored as flat NumPy arrays (doc ids and term frequencies
+    grouped by term), so scoring a query is a handful of array gathers and
+    one scatter-add regardless of how many titles are indexed.
+    """
+
+    def __init__(self, titles: List[str]):
+        self.titles = list(titles)
+
+        vocab: Dict[str, int] = {}
+        term_ids = []
+        doc_ids = []
+        freqs = []
+        doc_len = np.zeros(len(self.titles), dtype=np.float32)
+
+        for doc_id, title in enumerate(self.titles):
+            counts: Dict[int, int] = {}
+            tokens = tokenize(title)
+            doc_len[doc_id] = len(tokens)
+            for tok in tokens:
+                tid = vocab.setdefault(tok, len(vocab))
+                counts[tid] = counts.get(tid, 0) + 1
+            for tid, tf in counts.items():
+                term_ids.append(tid)
+                doc_ids.append(doc_id)
+                freqs.append(tf)
+
+        self.vocab = vocab
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+
+        # group postings by term: postings of term t live in [offsets[t], offsets[t+1])
+        order = np.argsort(term_ids, kind="stable")
+        self.post_docs = np.asarray(doc_ids, dtype=np.int32)[order]
+        tf = np.asarray(freqs, dtype=np.float32)[order]
+        df = np.bincount(term_ids, minlength=len(vocab))
+        self.offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+        n = max(len(self.titles), 1)
+        self.idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(doc_len.mean()) if len(doc_len) else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(avgdl, 1e-6))
+        # precomputed BM25 term weight for every posting
+        self.post_weight = tf * (BM25_K1 + 1) / (tf + norm[self.post_docs])
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.titles), dtype=np.float32)
+        for tok in set(tokenize(query)):
+            tid = self.vocab.get(tok)
+            if tid is None:
+                continue
+            start, end = self.offsets[tid], self.offsets[tid + 1]
+            # a term lists each doc at most once, so plain fancy-index add is safe
+            scores[self.post_docs[start:end]] += self.idf[tid] * self.post_weight[start:end]
+        return scores
+
+    def top_k(self, query: str, k: int = DB_TITLES_TOP_K) -> List[str]:
+        """
+        Titles most relevant to the query, best first. Titles sharing no
+        term with the query are never returned.
+        """
+        if not self.titles or k <= 0:
+            return []
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [self.titles[i] for i in hits]
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from services.blocking import run_blocking
+
+load_dotenv()
+
+# Disk-backed cache for external API tool calls (Tavily, GitHub).
+#
+# TOOL_CACHE_PATH        sqlite file
+# TOOL_CACHE_MAX_BYTES   total size of cached responses before LRU eviction
+# TOOL_CACHE_TTL         default TTL in seconds, TOOL_CACHE_TTL_<TOOL_NAME> per tool
+# TOOL_CACHE_BYPASS=1    skip the cache entirely (reads and writes)
+
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH", ".cache/tool_cache.sqlite3")
+TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "3600"))
+TOOL_CACHE_BYPASS = os.getenv("TOOL_CACHE_BYPASS", "0") == "1"
+
+_bypass = contextvars.ContextVar("tool_cache_bypass", default=False)
+
+
+def tool_ttl(tool_name: str, default: float = TOOL_CACHE_TTL) -> float:
+    return float(os.getenv(f"TOOL_CACHE_TTL_{tool_name.upper()}", str(default)))
+
+
+@contextmanager
+def bypass_tool_cache():
+    """
+    Force fresh tool calls inside the block, e.g. when the user asks for a refresh.
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class ToolCache:
+    """
+    TTL + size-bounded LRU response cache in one SQLite file.
+    """
+
+    def __init__(self, path: str = TOOL_CACHE_PATH, max_bytes: int = TOOL_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # bytes of cached responses, summed once on open and kept current by get/set/_evict
+        self._total = 0
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(tool_name: str, args: tuple, kwargs: dict) -> str:
+        raw = json.dumps([tool_name, args, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, tool_name: str, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value, expires_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+                    self._total -= row[2]
+                self.misses[tool_name] = self.misses.get(tool_name, 0) + 1
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits[tool_name] = self.hits.get(tool_name, 0) + 1
+        return json.loads(row[0])
+
+    def set(self, tool_name: str, key: str, value: Any, ttl: float):
+        payload = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool_name, payload, len(payload), now + ttl, now),
+            )
+            self._total += len(payload) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float, batch: int = 256):
+        # expired rows go first; they are only swept when the cache is over budget
+        expired = db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses WHERE expires_at < ?", (now,)
+        ).fetchone()[0]
+        if expired:
+            db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            self._total -= expired
+        # then least recently used first, a batch at a time off the accessed_at index
+        while self._total > self.max_bytes:
+            rows = db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                self._total = 0
+                return
+            doomed = []
+            for key, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                self._total -= size
+            db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = dict(self.hits), dict(self.misses)
+        return {
+            tool: {"hits": hits.get(tool, 0), "misses": misses.get(tool, 0)}
+            for tool in sorted(set(hits) | set(misses))
+        }
+
+
+tool_cache = ToolCache()
+
+
+def _cacheable(value: Any) -> bool:
+    # failed API calls come back as "Error: ..." strings; never pin those
+    return value is not None and not (isinstance(value, str) and value.startswith("Error:"))
+
+
+def cached_tool(tool_name: str, ttl: Optional[float] = None, cache: ToolCache = tool_cache):
+    """
+    Cache a tool function's result by its arguments.
+
+    Goes under @tool / Tool(func=...) so agents see the same signature and
+    docstring. Works for sync and async functions; async ones do their
+    SQLite work on the blocking I/O pool.
+    """
+    ttl = tool_ttl(tool_name) if ttl is None else ttl
+
+    def skip() -> bool:
+        return TOOL_CACHE_BYPASS or _bypass.get()
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if skip():
+                    return await func(*args, **kwargs)
+                key = cache.make_key(tool_name, args, kwargs)
+                hit = await run_blocking(cache.get, tool_name, key)
+                if hit is not None:
+                    return hit
+                result = await func(*args, **kwargs)
+                if _cacheable(result):
+                    await run_blocking(cache.set, tool_name, key, result, ttl)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if skip():
+                return func(*args, **kwargs)
+            key = cache.make_key(tool_name, args, kwargs)
+            hit = cache.get(tool_name, key)
+            if hit is not None:
+                return hit
+            result = func(*args, **kwargs)
+            if _cacheable(result):
+                cache.set(tool_name, key, result, ttl)
+            return result
+        return wrapper
+
+    return decorator
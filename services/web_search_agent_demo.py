@@ -1,9 +1,11 @@
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.tools import tool
+from langchain_core.tools import tool, StructuredTool
 from langchain.agents import create_agent
 from dotenv import load_dotenv
 from services.tavily_search import tavily_client
+from services.blocking import to_async
+from services.tool_cache import cached_tool
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 import os
 
@@ -24,8 +26,8 @@ web_search_agent_model = ChatGroq(
 )
 
 
-@tool
-def web_search(research_content: str):
+@cached_tool("web_search")
+def search_web(research_content: str):
     """Tool to do web search based on the research content given by user"""
     response = tavily_client.search(
         query=research_content,
@@ -40,6 +42,14 @@ def web_search(research_content: str):
     
         
     return combined_content
+
+
+# sync for multi_agent.py's .invoke, on the blocking I/O pool for agent.py
+web_search = StructuredTool.from_function(
+    func=search_web,
+    coroutine=to_async(search_web),
+    name="web_search",
+)
     
 
 